@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+
+class Subscription:
+    """Fila de mensagens de um assinante, alimentada pelo broker."""
+
+    def __init__(self, broker: "Broker", topics: Iterable[str], maxsize: int = 100):
+        self.broker = broker
+        self.topics = frozenset(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def deliver(self, message: Any) -> None:
+        # Assinante lento perde as mensagens mais antigas, nunca bloqueia o publicador
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Interface de publicação/assinatura por tópicos.
+
+    A implementação em processo atende um único worker; um transporte entre
+    workers (Redis, PostgreSQL LISTEN/NOTIFY) implementa a mesma interface e
+    é instalado com set_broker().
+    """
+
+    def publish(self, topics: Iterable[str], message: Any) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InProcessBroker(Broker):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    def publish(self, topics: Iterable[str], message: Any) -> None:
+        # Pode ser chamado de qualquer thread; a entrega ocorre no loop do assinante
+        with self._lock:
+            targets = set()
+            for topic in topics:
+                targets.update(self._topics.get(topic, ()))
+            self.published += 1
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Loop do assinante já encerrado
+                self.unsubscribe(subscription)
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(self, topics)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscriptions = set().union(*self._topics.values()) if self._topics else set()
+            return {"topics": len(self._topics), "subscriptions": len(subscriptions), "published": self.published}
+
+
+_broker: Broker = InProcessBroker()
+
+
+def get_broker() -> Broker:
+    return _broker
+
+
+def set_broker(broker: Broker) -> None:
+    global _broker
+    _broker = broker
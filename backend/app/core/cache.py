@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU limitado, com expiração por entrada e contadores de acerto."""
+
+    def __init__(self, maxsize: int, ttl: float, weigh: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Com weigh, soma o tamanho estimado das entradas (ex.: bytes) para as estatísticas
+        self.weigh = weigh
+        self.weight = 0
+        self._weights: Dict[Hashable, int] = {}
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        weight = self.weigh(value) if self.weigh else 0
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, value)
+            if self.weigh:
+                self._weights[key] = weight
+                self.weight += weight
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key: Hashable) -> None:
+        # Chamado com o lock adquirido
+        if self._data.pop(key, _MISSING) is not _MISSING and self.weigh:
+            self.weight -= self._weights.pop(key)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            **({"bytes": self.weight} if self.weigh else {})
+        }
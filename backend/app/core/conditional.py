@@ -0,0 +1,71 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Sequence
+from fastapi import Request, Response
+
+# Clientes sempre revalidam; a revalidação custa uma consulta por chave primária
+CACHE_CONTROL = "private, no-cache"
+
+
+def collection_etag(name: str, version: int, request: Request, related: Sequence[int] = ()) -> str:
+    # A página depende dos parâmetros (skip, limit, cursor...), então eles entram no ETag;
+    # related são as versões dos recursos incluídos via expand=
+    query = hashlib.sha1(str((sorted(request.query_params.multi_items()), list(related))).encode()).hexdigest()[:16]
+    return f'"{name}-{version}-{query}"'
+
+
+def row_etag(name: str, version: int, row_id: int, changed_at: Optional[datetime]) -> str:
+    stamp = changed_at.isoformat() if changed_at else ""
+    digest = hashlib.sha1(f"{row_id}:{stamp}:{version}".encode()).hexdigest()[:16]
+    return f'"{name}-{row_id}-{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> Optional[Response]:
+    # If-None-Match tem precedência; If-Modified-Since só vale sem ele
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        matched = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+    if not matched:
+        return None
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    response.headers.update(validator_headers(etag, last_modified))
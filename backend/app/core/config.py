@@ -1,15 +1,86 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./ecomanager.db"
+    # Derivada de DATABASE_URL (aiosqlite/asyncpg) quando não informada
+    ASYNC_DATABASE_URL: Optional[str] = None
+    
+    # Perfil do engine: pool (PostgreSQL) e PRAGMAs aplicados a cada conexão (SQLite)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_CACHE_SIZE: int = -64000
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
     
     # JWT
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    
+    # Cache de resultados das consultas repetidas (dashboard, barra lateral), invalidado por tag nas escritas
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_SIZE: int = 1024
+    RESULT_CACHE_TTL_SECONDS: int = 30
+    
+    # Hash de senhas (bcrypt) fora do event loop; 0 workers executa inline
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+    
+    # Ingestão de métricas
+    METRICS_BATCH_MAX_SIZE: int = 5000
+    METRICS_STREAM_CHUNK_SIZE: int = 1000
+    METRICS_STREAM_MAX_ERRORS: int = 100
+    METRICS_PAGE_DEFAULT_LIMIT: int = 1000
+    METRICS_PAGE_MAX_LIMIT: int = 10000
+    METRICS_EXPORT_CHUNK_SIZE: int = 10000
+    
+    # Listas grandes serializadas direto das colunas com orjson (mesmo JSON do caminho padrão)
+    FAST_JSON_RESPONSES: bool = True
+    
+    # Estatísticas móveis e anomalias por localização, calculadas em um pool de threads (0 usa o executor padrão do event loop)
+    ANALYTICS_WORKERS: int = 2
+    ANALYTICS_QUEUE_LIMIT: int = 8
+    ANALYTICS_MAX_ROWS: int = 2000000
+    ANALYTICS_MAX_WINDOW: int = 1000
+    
+    # Busca textual em processos e alertas
+    SEARCH_PAGE_DEFAULT_LIMIT: int = 20
+    SEARCH_PAGE_MAX_LIMIT: int = 100
+    
+    # Motor de regras de alerta (avaliado em segundo plano, em lotes)
+    RULE_ENGINE_ENABLED: bool = True
+    RULE_ENGINE_QUEUE_SIZE: int = 1000
+    RULE_ENGINE_MAX_BATCH_ROWS: int = 50000
+    # Leituras mais antigas que isso (ex.: cargas históricas via /backfill) não disparam regras (0 desativa)
+    RULE_ENGINE_MAX_READING_AGE_MINUTES: int = 60
+    
+    # Reconciliação periódica dos contadores de alertas não lidos (0 desativa)
+    ALERT_COUNTERS_RECONCILE_SECONDS: int = 900
+    
+    # Recarga periódica dos agregados do dashboard a partir do banco (0 desativa)
+    DASHBOARD_AGGREGATES_RELOAD_SECONDS: int = 300
+    
+    # Instrumentação: /metrics (Prometheus) e log de requisições lentas com o SQL executado (0 desativa)
+    METRICS_ENDPOINT_ENABLED: bool = True
+    SLOW_REQUEST_LOG_MS: int = 0
+    SLOW_REQUEST_MAX_STATEMENTS: int = 50
+    
+    # Aviso de lazy loads (N+1) quando ENVIRONMENT=development: "warn", "raise" ou "off"
+    LAZY_LOAD_GUARD: str = "warn"
+    
+    # Índice espacial de localizações (grade regular em graus)
+    LOCATION_GRID_DEGREES: float = 0.1
+    LOCATION_GRID_MAX_CELLS: int = 400
     
     # Environment
     ENVIRONMENT: str = "development"
@@ -1,16 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+def _async_database_url(url: str) -> str:
+    driver, _, rest = url.partition("://")
+    dialect = driver.split("+")[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _is_sqlite_memory(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+def _engine_options(url: str, is_async: bool = False) -> dict:
+    if _is_sqlite(url) and _is_sqlite_memory(url):
+        return {}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    # O aiosqlite usa NullPool por padrão e reabriria (e reconfiguraria) a conexão a cada sessão
+    if is_async and _is_sqlite(url):
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+def _configure_sqlite(engine: Engine, url: str) -> None:
+    # WAL permite leituras concorrentes durante a ingestão; não se aplica a bancos em memória
+    pragmas = [
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+    if not _is_sqlite_memory(url):
+        pragmas.insert(0, f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def _create_engine(url: str) -> Engine:
+    engine = create_engine(url, **_engine_options(url))
+    if _is_sqlite(url):
+        _configure_sqlite(engine, url)
+    return engine
+
+def _create_async_engine(url: str):
+    async_engine = create_async_engine(url, **_engine_options(url, is_async=True))
+    if _is_sqlite(url):
+        _configure_sqlite(async_engine.sync_engine, url)
+    return async_engine
+
+# Engine síncrono: db_init.py, scripts e tarefas fora do event loop
+engine = _create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrono usado pelas rotas
+async_engine = _create_async_engine(settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def _pool_stats(pool) -> dict:
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+def pool_stats() -> dict:
+    return {"sync": _pool_stats(engine.pool), "async": _pool_stats(async_engine.pool)}
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,276 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Rota de requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+UNMATCHED = "unmatched"
+
+_INF_BUCKET = 'le="+Inf"'
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # Contagem por faixa; o acumulado do formato Prometheus é montado só na exportação
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """SQL executado durante uma requisição, preenchido pelos eventos do engine."""
+
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self, collect_statements: bool = False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements: Optional[List[Tuple[str, float]]] = [] if collect_statements else None
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight: Dict[str, int] = defaultdict(int)
+        self.latency: Dict[tuple, Histogram] = {}
+        self.response_size: Dict[tuple, Histogram] = {}
+        self.db_queries: Dict[tuple, Histogram] = {}
+        self.db_time: Dict[tuple, Histogram] = {}
+        # SQL fora de requisições (motor de regras, reconciliação, tarefas)
+        self.background_queries = 0
+        self.background_db_time = 0.0
+
+    @staticmethod
+    def _histogram(series: Dict[tuple, Histogram], key: tuple, buckets: Sequence[float]) -> Histogram:
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        return histogram
+
+    def observe_request(self, method: str, route: str, status: int, elapsed: float, size: int, stats: RequestStats) -> None:
+        # Chamado no event loop, ao fim de cada requisição
+        key = (method, route)
+        self._histogram(self.latency, (method, route, str(status)), LATENCY_BUCKETS).observe(elapsed)
+        self._histogram(self.response_size, key, SIZE_BUCKETS).observe(size)
+        self._histogram(self.db_queries, key, QUERY_COUNT_BUCKETS).observe(stats.queries)
+        self._histogram(self.db_time, key, LATENCY_BUCKETS).observe(stats.db_time)
+
+    def observe_background_query(self, elapsed: float) -> None:
+        # Pode vir de qualquer thread
+        with self._lock:
+            self.background_queries += 1
+            self.background_db_time += elapsed
+
+    def clear(self) -> None:
+        with self._lock:
+            self.in_flight.clear()
+            self.latency.clear()
+            self.response_size.clear()
+            self.db_queries.clear()
+            self.db_time.clear()
+            self.background_queries = 0
+            self.background_db_time = 0.0
+
+
+registry = Registry()
+
+
+def _route_name(scope: dict) -> str:
+    # O FastAPI grava a rota casada no scope; o modelo do caminho mantém a cardinalidade baixa
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED
+
+
+def _log_slow_request(method: str, route: str, path: str, status: int, elapsed: float, stats: RequestStats) -> None:
+    lines = [
+        f"{duration * 1000:9.1f}ms  {' '.join(statement.split())}"
+        for statement, duration in stats.statements or ()
+    ]
+    omitted = stats.queries - len(lines)
+    if omitted > 0:
+        lines.append(f"... {omitted} more queries")
+    logger.warning(
+        "Slow request %s %s (%s) -> %d in %.1fms, %d queries, %.1fms in the database%s",
+        method, path, route, status, elapsed * 1000, stats.queries, stats.db_time * 1000,
+        "".join(f"\n  {line}" for line in lines)
+    )
+
+
+class InstrumentationMiddleware:
+    """Middleware ASGI com latência, tamanho de resposta e SQL por rota."""
+
+    def __init__(self, app, registry: Registry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        slow_threshold = settings.SLOW_REQUEST_LOG_MS / 1000
+        stats = RequestStats(collect_statements=slow_threshold > 0)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        token = _current_request.set(stats)
+        self.registry.in_flight[method] += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Inclui o envio do corpo: respostas em streaming contam até o último pedaço
+            elapsed = time.perf_counter() - started
+            self.registry.in_flight[method] -= 1
+            _current_request.reset(token)
+            route = _route_name(scope)
+            self.registry.observe_request(method, route, status, elapsed, size, stats)
+            if slow_threshold > 0 and elapsed >= slow_threshold:
+                _log_slow_request(method, route, scope.get("path", ""), status, elapsed, stats)
+
+
+def instrument_engine(engine: Engine, registry: Registry = registry) -> None:
+    # Para o engine assíncrono, passar async_engine.sync_engine
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context._instrumentation_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._instrumentation_started
+        # O contexto da requisição chega aqui pelo greenlet do SQLAlchemy e pelo threadpool
+        stats = _current_request.get()
+        if stats is None:
+            registry.observe_background_query(elapsed)
+            return
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.statements is not None and len(stats.statements) < settings.SLOW_REQUEST_MAX_STATEMENTS:
+            stats.statements.append((statement, elapsed))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_histograms(lines: List[str], name: str, help_text: str, labels: Sequence[str], series: Dict[tuple, Histogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key in sorted(series):
+        histogram = series[key]
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            le = 'le="%s"' % _format_value(float(bound))
+            lines.append(f"{name}_bucket{_labels(labels, key, le)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, key, _INF_BUCKET)} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels, key)} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(labels, key)} {histogram.count}")
+
+
+def _render_gauge(lines: List[str], name: str, help_text: str, kind: str, labels: Sequence[str], series: Dict[tuple, float]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for key in sorted(series):
+        lines.append(f"{name}{_labels(labels, key)} {_format_value(series[key])}")
+
+
+def render_metrics(registry: Registry = registry, pools: Optional[dict] = None, caches: Optional[dict] = None) -> str:
+    """Exporta o registro no formato texto do Prometheus (versão 0.0.4).
+
+    Os valores são do processo atual; com vários workers do uvicorn, cada um
+    responde pelos próprios contadores.
+    """
+    lines: List[str] = []
+    _render_gauge(
+        lines, "http_requests_in_flight", "Requests currently being served.", "gauge",
+        ("method",), {(method,): count for method, count in registry.in_flight.items()}
+    )
+    _render_histograms(
+        lines, "http_request_duration_seconds", "Request latency, including the response body.",
+        ("method", "route", "status"), dict(registry.latency)
+    )
+    _render_histograms(
+        lines, "http_response_size_bytes", "Response body size.", ("method", "route"), dict(registry.response_size)
+    )
+    _render_histograms(
+        lines, "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), dict(registry.db_queries)
+    )
+    _render_histograms(
+        lines, "http_request_db_duration_seconds", "Time spent in SQL statements per request.",
+        ("method", "route"), dict(registry.db_time)
+    )
+    _render_gauge(
+        lines, "db_background_queries_total", "SQL statements executed outside requests.", "counter",
+        (), {(): registry.background_queries}
+    )
+    _render_gauge(
+        lines, "db_background_duration_seconds_total", "Time spent in SQL statements outside requests.", "counter",
+        (), {(): registry.background_db_time}
+    )
+    if pools:
+        _render_gauge(
+            lines, "db_pool_connections", "Connection pool state.", "gauge", ("engine", "state"),
+            {
+                (engine, state): value
+                for engine, stats in pools.items()
+                for state, value in stats.items() if isinstance(value, int)
+            }
+        )
+    if caches:
+        for field, name, help_text, kind in (
+            ("size", "cache_entries", "Entries currently cached.", "gauge"),
+            ("bytes", "cache_bytes", "Estimated size of the cached values.", "gauge"),
+            ("hits", "cache_hits_total", "Cache lookups that found an entry.", "counter"),
+            ("misses", "cache_misses_total", "Cache lookups that missed.", "counter"),
+        ):
+            _render_gauge(
+                lines, name, help_text, kind, ("cache",),
+                {(cache,): stats[field] for cache, stats in caches.items() if field in stats}
+            )
+    return "\n".join(lines) + "\n"
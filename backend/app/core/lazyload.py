@@ -0,0 +1,36 @@
+import logging
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+logger = logging.getLogger(__name__)
+
+
+class LazyLoadError(RuntimeError):
+    pass
+
+
+def _describe(state: ORMExecuteState) -> str:
+    path = state.loader_strategy_path
+    relationship = str(path[-1]) if path is not None and len(path) else "relationship"
+    identity = state.lazy_loaded_from.identity
+    key = identity[0] if identity and len(identity) == 1 else identity
+    return f"{relationship} (id={key})"
+
+
+def install_lazy_load_guard(raise_error: bool = False, session_class=Session) -> None:
+    """Reporta relacionamentos carregados sob demanda (lazy load).
+
+    Em uma lista, cada acesso desses durante a serialização da resposta vira
+    uma consulta por linha (N+1); o relacionamento deve vir de ``expand=`` ou
+    de um ``selectinload``/``joinedload`` na consulta. Com ``raise_error`` a
+    carga falha com ``LazyLoadError`` em vez de só registrar o aviso.
+    """
+    # Vale também para o AsyncSession, que executa sobre um Session síncrono
+    @event.listens_for(session_class, "do_orm_execute")
+    def report_lazy_load(state: ORMExecuteState):
+        if not state.is_select or state.lazy_loaded_from is None:
+            return
+        message = f"Lazy load of {_describe(state)}; load it eagerly (expand=, selectinload or joinedload)"
+        if raise_error:
+            raise LazyLoadError(message)
+        logger.warning(message)
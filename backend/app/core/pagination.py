@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+
+def encode_cursor(*values: Any) -> str:
+    # Cursor opaco: posição da última linha da página em JSON/base64
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_cursor_datetime(value: Any) -> datetime:
+    if not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    return datetime.fromisoformat(value)
+
+
+def next_cursor(items: Sequence[Any], limit: int, *fields: str) -> Optional[str]:
+    # Página cheia indica que pode haver mais linhas depois da última
+    if len(items) < limit or not items:
+        return None
+    last = items[-1]
+    return encode_cursor(*(getattr(last, field) for field in fields))
+
+
+def set_page_headers(response, items: Sequence[Any], limit: int, *fields: str, total: Optional[int] = None) -> None:
+    cursor = next_cursor(items, limit, *fields)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
@@ -0,0 +1,133 @@
+import functools
+import pickle
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, Type
+from pydantic import BaseModel
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+_MISSING = object()
+
+
+class ResultCacheBackend:
+    """Armazenamento do cache de resultados das consultas.
+
+    As tags são invalidadas por geração: cada tag tem um contador que entra na
+    chave das entradas, e invalidar só incrementa o contador; as entradas
+    antigas deixam de ser encontradas e saem por LRU/TTL. Um armazenamento
+    compartilhado entre workers (Redis, memcached) guarda valores e contadores
+    com a mesma interface e é instalado com set_result_cache().
+    """
+
+    def get(self, key: Hashable) -> Any:
+        # Retorna _MISSING quando a chave não existe ou expirou
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def tag_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        raise NotImplementedError
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+def _pickled_size(value: Any) -> int:
+    # Tamanho serializado: a mesma ordem de grandeza que o valor ocuparia num armazenamento externo
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class InProcessResultCache(ResultCacheBackend):
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize, ttl, weigh=_pickled_size)
+        self._lock = threading.Lock()
+        self._tags: Dict[str, int] = defaultdict(int)
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        return self._entries.get(key, _MISSING)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries.set(key, value, ttl)
+
+    def tag_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._tags[tag] for tag in tags)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] += 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {**self._entries.stats(), "invalidations": self.invalidations}
+
+
+_result_cache: ResultCacheBackend = InProcessResultCache(settings.RESULT_CACHE_SIZE, settings.RESULT_CACHE_TTL_SECONDS)
+# Acertos e faltas por método decorado, para achar o que vale (ou não) manter em cache
+_function_stats: Dict[str, list] = defaultdict(lambda: [0, 0])
+
+
+def get_result_cache() -> ResultCacheBackend:
+    return _result_cache
+
+
+def set_result_cache(cache: ResultCacheBackend) -> None:
+    global _result_cache
+    _result_cache = cache
+
+
+def invalidate_cache_tags(*tags: str) -> None:
+    # Chamado depois do commit: antes dele, uma leitura concorrente recolocaria o dado antigo
+    _result_cache.invalidate(tags)
+
+
+def cached_result(*tags: str, schema: Optional[Type[BaseModel]] = None, ttl: Optional[float] = None):
+    """Decora um método de serviço ``(db, ...)`` cujo resultado depende só dos argumentos.
+
+    Com ``schema``, as linhas são convertidas para esse schema antes de ir para
+    o cache: objetos ORM ficam presos à sessão que os carregou. O valor em
+    cache é compartilhado entre requisições e não deve ser alterado.
+    """
+    def decorator(func: Callable) -> Callable:
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(db, *args, **kwargs):
+            if not settings.RESULT_CACHE_ENABLED:
+                return func(db, *args, **kwargs)
+            cache = _result_cache
+            # Versões lidas antes da consulta: uma escrita no meio do caminho muda a chave
+            key = (name, args, tuple(sorted(kwargs.items())), cache.tag_versions(tags))
+            counters = _function_stats[name]
+            value = cache.get(key)
+            if value is not _MISSING:
+                counters[0] += 1
+                return value
+            counters[1] += 1
+            result = func(db, *args, **kwargs)
+            if schema is not None:
+                result = [schema.model_validate(row) for row in result]
+            cache.set(key, result, ttl)
+            return result
+        return wrapper
+    return decorator
+
+
+def result_cache_stats() -> dict:
+    functions = {}
+    for name, (hits, misses) in sorted(_function_stats.items()):
+        total = hits + misses
+        functions[name] = {"hits": hits, "misses": misses, "hit_ratio": hits / total if total else 0.0}
+    return {**_result_cache.stats(), "functions": functions}
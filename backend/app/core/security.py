@@ -1,17 +1,27 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.database import get_db
-from app.models.models import User
-from app.schemas.schemas import TokenData
+from app.core.database import get_async_db
+from app.models.models import User, UserRole
+from app.schemas.schemas import TokenData, User as UserSchema
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="api/auth/token", auto_error=False)
+
+# Tokens já verificados (token -> username) e usuários carregados (username -> snapshot)
+_token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+_user_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -19,6 +29,36 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# bcrypt libera o GIL, então um pool de threads dedicado basta para tirá-lo do event loop
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_pending = 0
+
+async def _run_hashing(func, *args):
+    global _hash_executor, _hash_pending
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+    if _hash_pending >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent authentication requests",
+            headers={"Retry-After": "1"},
+        )
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+        )
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -30,6 +70,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str, credentials_exception):
+    username = _token_cache.get(token)
+    if username is not None:
+        return TokenData(username=username)
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
@@ -38,21 +81,61 @@ def verify_token(token: str, credentials_exception):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
+    # A entrada nunca sobrevive à expiração do próprio token
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        _token_cache.set(token, username, ttl=expires_at - time.time())
     return token_data
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def invalidate_user_cache(username: str) -> None:
+    _user_cache.delete(username)
+
+def clear_auth_cache() -> None:
+    _token_cache.clear()
+    _user_cache.clear()
+
+def auth_cache_stats() -> dict:
+    return {"tokens": _token_cache.stats(), "users": _user_cache.stats()}
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    return await _authenticate(token, db)
+
+async def _authenticate(token: Optional[str], db: AsyncSession):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     token_data = verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+    user = _user_cache.get(token_data.username)
+    if user is not None:
+        return user
+    db_user = (await db.execute(select(User).where(User.username == token_data.username))).scalar_one_or_none()
+    if db_user is None:
         raise credentials_exception
+    user = UserSchema.model_validate(db_user)
+    _user_cache.set(user.username, user)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return current_user
+
+async def get_current_active_stream_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # EventSource não envia cabeçalhos; o token pode vir na query string
+    current_user = await _authenticate(token or access_token, db)
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
@@ -0,0 +1,108 @@
+import json
+import math
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Type, get_args
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from app.core.config import settings
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+
+def schema_columns(model, schema: Type[BaseModel]) -> list:
+    # Colunas na ordem dos campos do schema, para que o JSON saia na mesma ordem de chaves
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def fast_columns(model, schema: Type[BaseModel]) -> Optional[list]:
+    # None desativa o caminho rápido e a rota segue com objetos ORM
+    return schema_columns(model, schema) if settings.FAST_JSON_RESPONSES else None
+
+
+@lru_cache(maxsize=None)
+def _float_fields(schema: Type[BaseModel]) -> tuple:
+    return tuple(
+        name for name, field in schema.model_fields.items()
+        if field.annotation is float or float in get_args(field.annotation)
+    )
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def _matches_stdlib_float(value: Any) -> bool:
+    # Fora dessa faixa o json da stdlib usa expoente ("1e+16", "1e-05") e o orjson não
+    if value is None:
+        return True
+    if not math.isfinite(value):
+        return False
+    magnitude = abs(value)
+    return magnitude == 0 or 1e-4 <= magnitude < 1e15
+
+
+def render_rows(schema: Type[BaseModel], rows: Sequence[Any]) -> bytes:
+    """Serializa linhas de colunas (ver ``schema_columns``) como ``List[schema]``.
+
+    Gera os mesmos bytes que o caminho padrão do FastAPI (validação pelo
+    ``response_model`` e ``json.dumps``), sem hidratar objetos ORM nem revalidar
+    com pydantic.
+    """
+    fields = tuple(schema.model_fields)
+    items = [dict(zip(fields, row)) for row in rows]
+    float_fields = _float_fields(schema)
+    if all(_matches_stdlib_float(item[name]) for item in items for name in float_fields):
+        return orjson.dumps(items, option=orjson.OPT_UTC_Z)
+
+    # Valores raros (expoentes, NaN): mantém o comportamento do caminho padrão
+    return _render_validated(schema, items)
+
+
+def _render_validated(schema: Type[BaseModel], items: list, exclude_unset: bool = False) -> bytes:
+    adapter = _list_adapter(schema)
+    content = adapter.dump_python(adapter.validate_python(items), mode="json", exclude_unset=exclude_unset)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _own_fields(schema: Type[BaseModel]) -> frozenset:
+    return frozenset(schema.model_fields) - frozenset(schema.__base__.model_fields)
+
+
+def render_expanded(schema: Type[BaseModel], objects: Sequence[Any], relations: Sequence[str]) -> bytes:
+    """Serializa objetos ORM com os relacionamentos pedidos em ``expand=``.
+
+    ``schema`` estende o schema da lista só com os relacionamentos. Os que não
+    foram pedidos nem são lidos dos objetos (não disparam lazy load) e ficam
+    fora do JSON.
+    """
+    fields = [name for name in schema.model_fields if name not in _own_fields(schema)]
+    items = [
+        {**{name: getattr(obj, name) for name in fields}, **{name: getattr(obj, name) for name in relations}}
+        for obj in objects
+    ]
+    return _render_validated(schema, items, exclude_unset=True)
+
+
+def _route_headers(response: Response) -> dict:
+    # Preserva os cabeçalhos já definidos na resposta da rota (paginação)
+    return {key: value for key, value in response.headers.items() if key != "content-length"}
+
+
+def rows_response(schema: Type[BaseModel], rows: Sequence[Any], response: Response) -> FastJSONResponse:
+    return FastJSONResponse(render_rows(schema, rows), headers=_route_headers(response))
+
+
+def expanded_response(
+    schema: Type[BaseModel], objects: Sequence[Any], relations: Sequence[str], response: Response
+) -> FastJSONResponse:
+    return FastJSONResponse(render_expanded(schema, objects, relations), headers=_route_headers(response))
+
+
+def numpy_response(content: Any) -> FastJSONResponse:
+    # Arrays do NumPy saem como listas; NaN vira null
+    return FastJSONResponse(orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY))
@@ -1,7 +1,18 @@
+import argparse
+import multiprocessing
+import time
+from collections import defaultdict
+from typing import Iterator, List
+import numpy as np
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 from app.core.database import engine, Base, SessionLocal
-from app.models.models import User, Location, Process, Alert, ProcessStatus, AlertType, UserRole
+from app.models.models import User, Location, Process, Alert, EnvironmentalMetric, ProcessStatus, AlertType, UserRole
 from app.core.security import get_password_hash
+from app.services.counters import reconcile_unread_counters
+from app.services.geo import grid_cell
+from app.services.rollups import MetricRollupService, upsert_statement
+from app.services.versions import LOCATIONS, PROCESSES, USERS, ResourceVersionService
 from datetime import datetime, timedelta
 
 def init_db():
@@ -64,12 +75,351 @@ def init_db():
         db.add(alert)
         
         db.commit()
+        reconcile_unread_counters(db)
         print("Dados iniciais criados com sucesso!")
     else:
         print("Banco de dados já inicializado!")
     
     db.close()
 
-if __name__ == "__main__":
-    print("Inicializando banco de dados...")
+# Geração sintética em volume, para reproduzir localmente o comportamento em produção.
+# Uso: python -m app.db_init --seed --locations 1000 --metrics 20000000 --workers 4
+
+# Centros urbanos usados para agrupar as localizações geradas
+_CLUSTERS = [
+    (-23.55, -46.63), (-22.91, -43.17), (-19.92, -43.94), (-25.43, -49.27), (-30.03, -51.23),
+    (-12.97, -38.50), (-8.05, -34.88), (-3.12, -60.02), (-15.79, -47.88), (-1.46, -48.50),
+]
+_FIRST_NAMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+                "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vanessa", "Yuri"]
+_LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Ferreira", "Almeida", "Ribeiro"]
+_PROCESS_TITLES = ["Licença de Operação", "Licença de Instalação", "Outorga de uso de água",
+                   "Autorização de supressão vegetal", "Renovação de licença", "Estudo de impacto ambiental",
+                   "Plano de gerenciamento de resíduos", "Monitoramento de efluentes"]
+_PROCESS_STATUS_WEIGHTS = {
+    ProcessStatus.PENDING: 0.2, ProcessStatus.IN_ANALYSIS: 0.35, ProcessStatus.APPROVED: 0.3,
+    ProcessStatus.REJECTED: 0.08, ProcessStatus.EXPIRED: 0.07,
+}
+_ALERT_TYPE_WEIGHTS = {AlertType.WARNING: 0.5, AlertType.ERROR: 0.15, AlertType.INFO: 0.3, AlertType.SUCCESS: 0.05}
+_ROLE_WEIGHTS = {UserRole.ADMIN: 0.05, UserRole.MANAGER: 0.15, UserRole.ANALYST: 0.4, UserRole.VIEWER: 0.4}
+# (tipo, unidade, faixa do nível base, desvio do ruído, amplitude do ciclo diário, limites)
+_METRIC_PROFILES = [
+    ("air_quality", "µg/m³", (8.0, 45.0), 4.0, 0.35, (0.0, 500.0)),
+    ("water_quality", "%", (55.0, 95.0), 2.0, 0.03, (0.0, 100.0)),
+    ("vegetation_cover", "%", (20.0, 90.0), 0.5, 0.0, (0.0, 100.0)),
+]
+
+
+def _insert_batches(connection, table, rows: Iterator[dict], batch_size: int) -> int:
+    # INSERT multi-linha via Core, em lotes grandes
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            connection.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        connection.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def _weighted(rng: np.random.Generator, weights: dict, size: int) -> list:
+    choices = list(weights)
+    probabilities = np.array(list(weights.values()))
+    return [choices[index] for index in rng.choice(len(choices), size=size, p=probabilities / probabilities.sum())]
+
+
+def _seed_locations(connection, rng, count: int, batch_size: int) -> List[int]:
+    clusters = rng.integers(len(_CLUSTERS), size=count)
+    centers = np.array(_CLUSTERS)[clusters]
+    coordinates = centers + rng.normal(scale=0.6, size=(count, 2))
+    first_id = (connection.execute(select(func.max(Location.id))).scalar() or 0) + 1
+
+    def rows():
+        for index, (latitude, longitude) in enumerate(coordinates.tolist()):
+            yield {
+                "name": f"Estação {first_id + index}",
+                "description": "Estação de monitoramento ambiental",
+                "latitude": latitude,
+                "longitude": longitude,
+                # Inserts em lote não disparam os eventos do ORM
+                "grid_cell": grid_cell(latitude, longitude),
+                "address": f"Rodovia {rng.integers(10, 500)}, km {rng.integers(1, 900)}"
+            }
+
+    _insert_batches(connection, Location.__table__, rows(), batch_size)
+    return connection.execute(select(Location.id).where(Location.id >= first_id).order_by(Location.id)).scalars().all()
+
+
+def _seed_users(connection, rng, count: int, batch_size: int, run: str) -> List[int]:
+    # Um único hash para todos: bcrypt por usuário dominaria o tempo de carga
+    hashed_password = get_password_hash("password")
+    roles = _weighted(rng, _ROLE_WEIGHTS, count)
+
+    def rows():
+        for index in range(count):
+            first = _FIRST_NAMES[rng.integers(len(_FIRST_NAMES))]
+            last = _LAST_NAMES[rng.integers(len(_LAST_NAMES))]
+            username = f"{first.lower()}.{last.lower()}.{run}{index}"
+            yield {
+                "email": f"{username}@ecomanager.com",
+                "username": username,
+                "full_name": f"{first} {last}",
+                "hashed_password": hashed_password,
+                "role": roles[index],
+                "is_active": rng.random() > 0.05
+            }
+
+    _insert_batches(connection, User.__table__, rows(), batch_size)
+    pattern = f"%.{run}%"
+    return connection.execute(select(User.id).where(User.username.like(pattern))).scalars().all()
+
+
+def _seed_processes(connection, rng, count, location_ids, user_ids, now, days, batch_size) -> None:
+    statuses = _weighted(rng, _PROCESS_STATUS_WEIGHTS, count)
+    ages = rng.uniform(0, days, size=count)
+
+    def rows():
+        for index in range(count):
+            created_at = now - timedelta(days=float(ages[index]))
+            location_id = int(location_ids[rng.integers(len(location_ids))])
+            yield {
+                "title": f"{_PROCESS_TITLES[rng.integers(len(_PROCESS_TITLES))]} - Estação {location_id}",
+                "description": "Processo gerado para testes de carga",
+                "status": statuses[index],
+                "priority": ("alta", "media", "baixa")[rng.integers(3)],
+                "due_date": created_at + timedelta(days=int(rng.integers(30, 180))),
+                "location_id": location_id,
+                "created_by_id": int(user_ids[rng.integers(len(user_ids))]),
+                "created_at": created_at,
+                "updated_at": created_at + timedelta(days=float(rng.uniform(0, 10))) if rng.random() < 0.5 else None
+            }
+
+    _insert_batches(connection, Process.__table__, rows(), batch_size)
+
+
+def _seed_alerts(connection, rng, count, location_ids, user_ids, now, days, batch_size) -> None:
+    types = _weighted(rng, _ALERT_TYPE_WEIGHTS, count)
+    # Alertas recentes são mais frequentes; os antigos quase sempre já foram lidos
+    ages = np.minimum(rng.exponential(scale=days / 4, size=count), days)
+
+    def rows():
+        for index in range(count):
+            age = float(ages[index])
+            yield {
+                "title": f"Alerta de monitoramento {index}",
+                "message": "Leitura fora dos limites configurados",
+                "alert_type": types[index],
+                "location_id": int(location_ids[rng.integers(len(location_ids))]),
+                "user_id": int(user_ids[rng.integers(len(user_ids))]),
+                "is_read": bool(rng.random() < (0.95 if age > 7 else 0.4)),
+                "created_at": now - timedelta(days=age)
+            }
+
+    _insert_batches(connection, Alert.__table__, rows(), batch_size)
+
+
+def _metric_series(rng, profile, start: np.datetime64, seconds: float, points: int) -> tuple:
+    (low, high), noise, daily_amplitude, (minimum, maximum) = profile
+    interval = seconds / points
+    offsets = np.arange(points) * interval + rng.uniform(0, interval * 0.5, size=points)
+    stamps = start + (offsets * 1e6).astype("timedelta64[us]")
+    hours = offsets / 3600.0
+    base = rng.uniform(low, high)
+    # Nível base + sazonalidade anual + ciclo diário + ruído com picos ocasionais
+    values = base * (1 + 0.1 * np.sin(2 * np.pi * hours / (24 * 365)) + daily_amplitude * np.sin(2 * np.pi * (hours - 8) / 24))
+    values += rng.normal(scale=noise, size=points)
+    spikes = rng.random(points) < 0.002
+    values[spikes] *= rng.uniform(1.5, 3.0, size=int(spikes.sum()))
+    return stamps, np.clip(values, minimum, maximum).round(2)
+
+
+class _ColumnBuffer:
+    # Acumula colunas (arrays numpy) de um lote e grava com um único executemany
+    def __init__(self, table, upsert_model=None):
+        self.table = table
+        # Com upsert_model, soma aos buckets de rollup que já existirem em vez de só inserir
+        self.upsert_model = upsert_model
+        self.columns = defaultdict(list)
+        self.size = 0
+
+    def extend(self, columns: dict) -> None:
+        for name, values in columns.items():
+            self.columns[name].append(values)
+        self.size += len(next(iter(columns.values())))
+
+    def flush(self, connection) -> None:
+        if not self.size:
+            return
+        names = list(self.columns)
+        # Só o INSERT direto no driver do SQLite recebe as datas já como texto
+        raw = self.upsert_model is None and connection.dialect.name == "sqlite"
+        values = [self._driver_values(np.concatenate(self.columns[name]), raw) for name in names]
+        if self.upsert_model is not None:
+            statement = upsert_statement(connection.dialect.name, self.upsert_model)
+            connection.execute(statement, [dict(zip(names, row)) for row in zip(*values)])
+        elif raw:
+            # Direto no driver: o processamento de parâmetros por linha do SQLAlchemy dominaria o tempo
+            placeholders = ", ".join("?" for _ in names)
+            connection.exec_driver_sql(
+                f"INSERT INTO {self.table.name} ({', '.join(names)}) VALUES ({placeholders})", list(zip(*values))
+            )
+        else:
+            connection.execute(insert(self.table), [dict(zip(names, row)) for row in zip(*values)])
+        self.columns.clear()
+        self.size = 0
+
+    @staticmethod
+    def _driver_values(values: np.ndarray, raw: bool) -> list:
+        if values.dtype.kind == "M":
+            if raw:
+                # Mesmo formato de texto que o tipo DateTime do SQLAlchemy grava no SQLite
+                return np.char.replace(np.datetime_as_string(values, unit="us"), "T", " ").tolist()
+            return values.astype("datetime64[us]").tolist()
+        return values.tolist()
+
+
+def _seed_metrics_worker(task: tuple) -> int:
+    location_ids, points, now, days, batch_size, seed, reused_locations = task
+    # Processos filhos não podem reutilizar as conexões herdadas do processo pai
+    if multiprocessing.parent_process() is not None:
+        engine.dispose(close=False)
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(now, "us")
+    seconds = days * 86400.0
+    start = end - np.timedelta64(int(seconds * 1e6), "us")
+    metrics = _ColumnBuffer(EnvironmentalMetric.__table__)
+    rollups = {}
+    total = 0
+
+    with engine.connect() as connection:
+        for location_id in location_ids:
+            for metric_type, unit, *profile in _METRIC_PROFILES:
+                stamps, values = _metric_series(rng, profile, start, seconds, points)
+                metrics.extend({
+                    "metric_type": np.full(points, metric_type, dtype=object),
+                    "value": values,
+                    "unit": np.full(points, unit, dtype=object),
+                    "location_id": np.full(points, location_id),
+                    "recorded_at": stamps
+                })
+                # Localizações recém-criadas só têm buckets novos; as reutilizadas já podem ter rollups
+                for model, columns in MetricRollupService.series_buckets(metric_type, location_id, stamps, values).items():
+                    buffer = rollups.get(model)
+                    if buffer is None:
+                        buffer = rollups[model] = _ColumnBuffer(model.__table__, model if reused_locations else None)
+                    buffer.extend(columns)
+                total += points
+            # Séries inteiras por transação: métricas e rollups de uma localização nunca ficam pela metade
+            if metrics.size >= batch_size:
+                for buffer in (metrics, *rollups.values()):
+                    buffer.flush(connection)
+                connection.commit()
+        for buffer in (metrics, *rollups.values()):
+            buffer.flush(connection)
+        connection.commit()
+    return total
+
+
+def seed_synthetic_data(
+    locations: int = 500,
+    users: int = 50,
+    processes: int = 5000,
+    alerts: int = 20000,
+    metrics: int = 1_000_000,
+    days: int = 365,
+    batch_size: int = 20000,
+    workers: int = 1,
+    seed: int = 42
+) -> dict:
     init_db()
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    run = f"{seed}x{int(time.time())}"
+
+    with engine.begin() as connection:
+        location_ids = _seed_locations(connection, rng, locations, batch_size)
+        user_ids = _seed_users(connection, rng, users, batch_size, run)
+        reused_locations = not location_ids
+        # Sem novos registros, os dados gerados referenciam os já existentes
+        location_ids = location_ids or connection.execute(select(Location.id)).scalars().all()
+        user_ids = user_ids or connection.execute(select(User.id)).scalars().all()
+        _seed_processes(connection, rng, processes, location_ids, user_ids, now, days, batch_size)
+        _seed_alerts(connection, rng, alerts, location_ids, user_ids, now, days, batch_size)
+
+    # Métricas: séries por (localização, tipo), particionadas por localização entre os workers.
+    # O SQLite aceita um único escritor, então lá a carga é sempre sequencial
+    if engine.dialect.name == "sqlite":
+        workers = 1
+    points = max(metrics // (len(location_ids) * len(_METRIC_PROFILES)), 1)
+    partitions = [location_ids[index::workers] for index in range(workers)]
+    tasks = [
+        (partition, points, now, days, batch_size, seed + index, reused_locations)
+        for index, partition in enumerate(partitions) if partition
+    ]
+    if workers > 1:
+        engine.dispose()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            inserted_metrics = sum(pool.map(_seed_metrics_worker, tasks))
+    else:
+        inserted_metrics = sum(_seed_metrics_worker(task) for task in tasks)
+
+    db = SessionLocal()
+    try:
+        reconcile_unread_counters(db)
+        for name in (LOCATIONS, USERS, PROCESSES):
+            ResourceVersionService.bump(db, name)
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "locations": len(location_ids),
+        "users": len(user_ids),
+        "processes": processes,
+        "alerts": alerts,
+        "metrics": inserted_metrics,
+        "seconds": time.perf_counter() - started
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Inicializa o banco de dados e, opcionalmente, gera dados sintéticos")
+    parser.add_argument("--seed", action="store_true", help="gera dados sintéticos em volume")
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=5000)
+    parser.add_argument("--alerts", type=int, default=20000)
+    parser.add_argument("--metrics", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--random-seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print("Inicializando banco de dados...")
+    if not args.seed:
+        init_db()
+        return
+    result = seed_synthetic_data(
+        locations=args.locations,
+        users=args.users,
+        processes=args.processes,
+        alerts=args.alerts,
+        metrics=args.metrics,
+        days=args.days,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        seed=args.random_seed
+    )
+    print(
+        f"Gerados {result['locations']} localizações, {result['users']} usuários, {result['processes']} processos, "
+        f"{result['alerts']} alertas e {result['metrics']} métricas em {result['seconds']:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.routes import auth, dashboard, processes, monitoring, water_resources, flora_fauna, team, locations, alerts, settings as settings_routes
+from app.core.broker import get_broker
+from app.core.database import AsyncSessionLocal, async_engine, engine, pool_stats
+from app.core.instrumentation import CONTENT_TYPE, InstrumentationMiddleware, instrument_engine, render_metrics
+from app.core.lazyload import install_lazy_load_guard
+from app.core.result_cache import result_cache_stats
+from app.core.security import auth_cache_stats
+from app.services.async_services import AsyncAlertService, AsyncEnvironmentalMetricService
+from app.services.rules import rule_engine
+from app.routes import auth, dashboard, processes, monitoring, backfill, export, water_resources, flora_fauna, team, locations, alerts, settings as settings_routes
 
 app = FastAPI(
     title="EcoManager API",
@@ -16,6 +26,8 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Autenticação"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(processes.router, prefix="/api/processes", tags=["Processos"])
 app.include_router(monitoring.router, prefix="/api/monitoring", tags=["Monitoramento"])
+app.include_router(backfill.router, prefix="/api/monitoring/backfill", tags=["Monitoramento"])
+app.include_router(export.router, prefix="/api/monitoring/export", tags=["Monitoramento"])
 app.include_router(water_resources.router, prefix="/api/water-resources", tags=["Recursos Hídricos"])
 app.include_router(flora_fauna.router, prefix="/api/flora-fauna", tags=["Flora & Fauna"])
 app.include_router(team.router, prefix="/api/team", tags=["Equipe"])
@@ -23,13 +35,76 @@ app.include_router(locations.router, prefix="/api/locations", tags=["Localizaç
 app.include_router(alerts.router, prefix="/api/alerts", tags=["Alertas"])
 app.include_router(settings_routes.router, prefix="/api/settings", tags=["Configurações"])
 
+logger = logging.getLogger(__name__)
+_background_tasks = []
+
+async def reconcile_alert_counters():
+    # Corrige desvios dos contadores de alertas (ex.: cargas feitas direto no banco)
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await AsyncAlertService.reconcile_unread_counters(db)
+        except Exception:
+            logger.exception("Alert counter reconciliation failed")
+        await asyncio.sleep(settings.ALERT_COUNTERS_RECONCILE_SECONDS)
+
+async def reload_dashboard_aggregates():
+    # Incorpora as escritas feitas pelos outros workers (e direto no banco) aos agregados locais
+    while True:
+        await asyncio.sleep(settings.DASHBOARD_AGGREGATES_RELOAD_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await AsyncEnvironmentalMetricService.reload_dashboard_aggregates(db)
+        except Exception:
+            logger.exception("Dashboard aggregates reload failed")
+
+@app.on_event("startup")
+async def start_background_workers():
+    if settings.RULE_ENGINE_ENABLED:
+        rule_engine.start()
+    if settings.ALERT_COUNTERS_RECONCILE_SECONDS > 0:
+        _background_tasks.append(asyncio.create_task(reconcile_alert_counters()))
+    if settings.DASHBOARD_AGGREGATES_RELOAD_SECONDS > 0:
+        _background_tasks.append(asyncio.create_task(reload_dashboard_aggregates()))
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    rule_engine.stop()
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+
 @app.get("/")
 async def root():
     return {"message": "EcoManager API - Sistema de Gestão Ambiental"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "ecomanager-api"}
+    return {
+        "status": "healthy",
+        "service": "ecomanager-api",
+        "database": pool_stats(),
+        "auth_cache": auth_cache_stats(),
+        "result_cache": result_cache_stats(),
+        "broker": get_broker().stats(),
+        "rule_engine": rule_engine.stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    auth = auth_cache_stats()
+    caches = {"result": result_cache_stats(), "auth_tokens": auth["tokens"], "auth_users": auth["users"]}
+    return Response(render_metrics(pools=pool_stats(), caches=caches), media_type=CONTENT_TYPE)
+
+# Latência, tamanho de resposta e SQL por rota (ver /metrics)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+app.add_middleware(InstrumentationMiddleware)
+
+if settings.ENVIRONMENT == "development" and settings.LAZY_LOAD_GUARD != "off":
+    install_lazy_load_guard(raise_error=settings.LAZY_LOAD_GUARD == "raise")
 
 # Configurar CORS para permitir requisições do frontend
 app.add_middleware(
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Enum, Index, UniqueConstraint
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.services.geo import grid_cell
 import enum
 
 class UserRole(str, enum.Enum):
@@ -23,6 +25,14 @@ class AlertType(str, enum.Enum):
     INFO = "info"
     SUCCESS = "success"
 
+class AlertRuleKind(str, enum.Enum):
+    THRESHOLD = "threshold"
+    RATE_OF_CHANGE = "rate_of_change"
+
+class AlertRuleOperator(str, enum.Enum):
+    ABOVE = "above"
+    BELOW = "below"
+
 class User(Base):
     __tablename__ = "users"
     
@@ -60,15 +70,26 @@ class Process(Base):
 
 class Location(Base):
     __tablename__ = "locations"
+    __table_args__ = (
+        Index("ix_locations_latitude_longitude", "latitude", "longitude"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(Text)
     latitude = Column(Float)
     longitude = Column(Float)
+    grid_cell = Column(Integer, index=True)  # célula da grade espacial, ver services/geo.py
     address = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+# Mantém a célula da grade espacial sincronizada com as coordenadas
+@event.listens_for(Location, "before_insert")
+@event.listens_for(Location, "before_update")
+def _update_location_grid_cell(mapper, connection, target):
+    if target.latitude is not None and target.longitude is not None:
+        target.grid_cell = grid_cell(target.latitude, target.longitude)
+
 class Alert(Base):
     __tablename__ = "alerts"
     
@@ -85,8 +106,53 @@ class Alert(Base):
     user = relationship("User", back_populates="alerts")
     location = relationship("Location")
 
+    __table_args__ = (
+        # Índice parcial: a reconciliação dos contadores percorre apenas os não lidos
+        Index(
+            "ix_alerts_unread_user",
+            "user_id",
+            postgresql_where=is_read == False,
+            sqlite_where=is_read == False
+        ),
+    )
+
+class ResourceVersion(Base):
+    __tablename__ = "resource_versions"
+
+    # Contador de alterações por coleção (locations, users, processes), usado nos ETags
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+class AlertUnreadCounter(Base):
+    __tablename__ = "alert_unread_counters"
+
+    # user_id 0 guarda o contador global
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    unread = Column(Integer, nullable=False, default=0)
+
+class AlertRule(Base):
+    __tablename__ = "alert_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    metric_type = Column(String, index=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)  # nulo = todas
+    kind = Column(Enum(AlertRuleKind), default=AlertRuleKind.THRESHOLD)
+    operator = Column(Enum(AlertRuleOperator), default=AlertRuleOperator.ABOVE)
+    threshold = Column(Float)  # valor, ou variação por hora em rate_of_change
+    alert_type = Column(Enum(AlertType), default=AlertType.WARNING)
+    cooldown_minutes = Column(Integer, default=60)
+    is_active = Column(Boolean, default=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class EnvironmentalMetric(Base):
     __tablename__ = "environmental_metrics"
+    __table_args__ = (
+        Index("ix_environmental_metrics_type_location_recorded", "metric_type", "location_id", "recorded_at"),
+        Index("ix_environmental_metrics_type_recorded", "metric_type", "recorded_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     metric_type = Column(String)  # air_quality, water_quality, vegetation_cover
@@ -97,3 +163,84 @@ class EnvironmentalMetric(Base):
     
     # Relationships
     location = relationship("Location")
+
+# Agregados de séries temporais, mantidos a cada inserção de métricas
+class MetricRollupMixin:
+    id = Column(Integer, primary_key=True, index=True)
+    metric_type = Column(String, nullable=False)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    last_value = Column(Float, nullable=False)
+    last_recorded_at = Column(DateTime, nullable=False)
+
+class MetricRollupHourly(MetricRollupMixin, Base):
+    __tablename__ = "metric_rollups_hourly"
+    __table_args__ = (UniqueConstraint("metric_type", "location_id", "bucket_start"),)
+
+class MetricRollupDaily(MetricRollupMixin, Base):
+    __tablename__ = "metric_rollups_daily"
+    __table_args__ = (UniqueConstraint("metric_type", "location_id", "bucket_start"),)
+
+class MetricRollupMonthly(MetricRollupMixin, Base):
+    __tablename__ = "metric_rollups_monthly"
+    __table_args__ = (UniqueConstraint("metric_type", "location_id", "bucket_start"),)
+
+# Busca textual: índices de trigramas (GIN) no PostgreSQL e tabelas FTS5 espelhadas no SQLite
+SEARCHABLE_COLUMNS = {
+    "processes": ("title", "description"),
+    "alerts": ("title", "message"),
+}
+
+def search_table(table: str) -> str:
+    return f"{table}_fts"
+
+def _create_postgresql_search_indexes(connection) -> None:
+    connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in SEARCHABLE_COLUMNS.items():
+        for column in columns:
+            connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+def _create_sqlite_search_tables(connection) -> None:
+    for table, columns in SEARCHABLE_COLUMNS.items():
+        fts = search_table(table)
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+        ).first()
+        names = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{names}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        # Gatilhos mantêm o índice em sincronia com qualquer escrita, inclusive inserts em lote
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+        )
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+        )
+        if not exists:
+            # Tabela criada agora sobre dados já existentes: indexa o conteúdo atual
+            connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_indexes(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        _create_postgresql_search_indexes(connection)
+    elif connection.dialect.name == "sqlite":
+        _create_sqlite_search_tables(connection)
@@ -1,48 +1,172 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_active_user
-from app.services.services import AlertService
-from app.schemas.schemas import Alert, AlertCreate, AlertUpdate, User
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.pagination import set_page_headers
+from app.core.serialization import expanded_response
+from app.core.broker import get_broker
+from app.core.security import get_current_active_user, get_current_active_stream_user
+from app.models.models import Alert as AlertModel, UserRole
+from app.services.async_services import AsyncAlertService, AsyncAlertRuleService, AsyncSearchService, AsyncUserService, estimate_count
+from app.services.services import ALERTS_TOPIC, location_alerts_topic, parse_expand, user_alerts_topic
+from app.schemas.schemas import Alert, AlertBulkAcknowledge, AlertExpanded, AlertBulkAcknowledgeResult, AlertCreate, AlertRule, AlertRuleCreate, AlertSearchResult, AlertUpdate, User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Alert])
 async def get_alerts(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    expand: Optional[str] = Query(None, description="Relacionamentos incluídos, separados por vírgula: user, location"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return AlertService.get_alerts(db, skip=skip, limit=limit)
+    try:
+        relations = parse_expand(AlertModel, expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        alerts = await AsyncAlertService.get_alerts(db, skip=skip, limit=limit, cursor=cursor, expand=relations)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    total = await estimate_count(db, AlertModel) if include_total else None
+    set_page_headers(response, alerts, limit, "id", total=total)
+    if relations:
+        return expanded_response(AlertExpanded, alerts, relations, response)
+    return alerts
 
 @router.post("/", response_model=Alert)
 async def create_alert(
     alert: AlertCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return AlertService.create_alert(db=db, alert=alert, user_id=current_user.id)
+    return await AsyncAlertService.create_alert(db=db, alert=alert, user_id=current_user.id)
 
 @router.get("/recent", response_model=List[Alert])
 async def get_recent_alerts(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return AlertService.get_recent_alerts(db, limit=10)
+    return await AsyncAlertService.get_recent_alerts(db, limit=10)
+
+@router.get("/search", response_model=List[AlertSearchResult])
+async def search_alerts(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(settings.SEARCH_PAGE_DEFAULT_LIMIT, ge=1, le=settings.SEARCH_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        results = await AsyncSearchService.search(db, AlertModel, q, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_page_headers(response, results, limit, "score", "id")
+    return results
+
+@router.get("/unread-count")
+async def get_unread_count(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return {
+        "total": await AsyncAlertService.get_active_alerts_count(db),
+        "user": await AsyncAlertService.get_active_alerts_count(db, user_id=current_user.id)
+    }
+
+@router.get("/rules", response_model=List[AlertRule])
+async def get_alert_rules(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await AsyncAlertRuleService.get_rules(db)
+
+@router.post("/rules", response_model=AlertRule)
+async def create_alert_rule(
+    rule: AlertRuleCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await AsyncAlertRuleService.create_rule(db=db, rule=rule, user_id=current_user.id)
+
+@router.delete("/rules/{rule_id}", response_model=AlertRule)
+async def deactivate_alert_rule(
+    rule_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    rule = await AsyncAlertRuleService.deactivate_rule(db, rule_id=rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Alert rule not found")
+    return rule
+
+@router.put("/read", response_model=AlertBulkAcknowledgeResult)
+async def acknowledge_alerts(
+    criteria: AlertBulkAcknowledge,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        updated = await AsyncAlertService.acknowledge_alerts(db, criteria=criteria)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"updated": updated}
 
 @router.put("/{alert_id}/read")
 async def mark_alert_as_read(
     alert_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    from app.models.models import Alert as AlertModel
-    alert = db.query(AlertModel).filter(AlertModel.id == alert_id).first()
+    alert = await AsyncAlertService.mark_alert_as_read(db, alert_id=alert_id)
     if alert is None:
         raise HTTPException(status_code=404, detail="Alert not found")
-    
-    alert.is_read = True
-    db.commit()
     return {"message": "Alert marked as read"}
+
+@router.get("/stream")
+async def stream_alerts(
+    location_id: List[int] = Query([]),
+    all_alerts: bool = Query(False, description="Todos os alertas do sistema (apenas administradores)"),
+    current_user: User = Depends(get_current_active_stream_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if all_alerts:
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        topics = [ALERTS_TOPIC]
+    else:
+        # Sem localizações explícitas, as dos processos e regras do próprio usuário
+        locations = location_id or await AsyncUserService.get_user_location_ids(db, current_user.id)
+        topics = [location_alerts_topic(location) for location in locations]
+        topics.append(user_alerts_topic(current_user.id))
+    # A sessão não é usada durante o stream; liberar a conexão imediatamente
+    await db.close()
+    subscription = get_broker().subscribe(topics)
+
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    alert = await subscription.get(timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {alert['id']}\nevent: alert\ndata: {json.dumps(alert)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
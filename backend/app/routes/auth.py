@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.core.database import get_db
-from app.core.security import verify_password, create_access_token, get_current_active_user
+from app.core.database import get_async_db
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token, get_current_active_user
 from app.core.config import settings
-from app.services.services import UserService
+from app.services.async_services import AsyncUserService
 from app.schemas.schemas import Token, User, UserCreate
 
 router = APIRouter()
@@ -13,10 +13,12 @@ router = APIRouter()
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = UserService.get_user_by_username(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await AsyncUserService.get_user_by_username(db, form_data.username)
+    # Devolver a conexão ao pool antes de aguardar o bcrypt
+    await db.close()
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -30,16 +32,18 @@ async def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=User)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = UserService.get_user_by_email(db, email=user.email)
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await AsyncUserService.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    db_user = UserService.get_user_by_username(db, username=user.username)
+    db_user = await AsyncUserService.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    return UserService.create_user(db=db, user=user)
+    await db.close()
+    hashed_password = await get_password_hash_async(user.password)
+    return await AsyncUserService.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @router.get("/me", response_model=User)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.database import get_async_db
+from app.core.security import get_current_active_user
+from app.services.ingestion import CSV, NDJSON, get_upload_progress, ingest_metric_stream
+from app.schemas.schemas import MetricUploadProgress, User
+
+router = APIRouter()
+
+@router.post("/", response_model=MetricUploadProgress)
+async def upload_metrics(
+    request: Request,
+    format: Optional[str] = None,
+    upload_id: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Formato explícito ou inferido do Content-Type
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = CSV if "csv" in content_type else NDJSON
+    if format not in (CSV, NDJSON):
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'csv'")
+    if upload_id is not None and get_upload_progress(upload_id) is not None:
+        raise HTTPException(status_code=409, detail="Upload id already in use")
+
+    return await ingest_metric_stream(db, request.stream(), format, upload_id=upload_id)
+
+@router.get("/{upload_id}", response_model=MetricUploadProgress)
+async def get_upload_status(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    progress = get_upload_progress(upload_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return progress
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.core.security import get_current_active_user
-from app.services.services import ProcessService, AlertService, EnvironmentalMetricService
+from app.services.async_services import AsyncProcessService, AsyncAlertService, AsyncEnvironmentalMetricService
 from app.schemas.schemas import DashboardData, DashboardMetrics, User
 
 router = APIRouter()
@@ -10,11 +10,11 @@ router = APIRouter()
 @router.get("/", response_model=DashboardData)
 async def get_dashboard_data(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Obter métricas ambientais
-    metrics_data = EnvironmentalMetricService.get_latest_metrics(db)
-    active_alerts_count = AlertService.get_active_alerts_count(db)
+    metrics_data = await AsyncEnvironmentalMetricService.get_latest_metrics(db)
+    alerts_data = await AsyncAlertService.get_alerts_summary(db)
     
     metrics = DashboardMetrics(
         air_quality=metrics_data["air_quality"],
@@ -23,15 +23,15 @@ async def get_dashboard_data(
         water_resources_trend=metrics_data["water_resources_trend"],
         vegetation_cover=metrics_data["vegetation_cover"],
         vegetation_cover_trend=metrics_data["vegetation_cover_trend"],
-        active_alerts=active_alerts_count,
-        active_alerts_trend="-40% desde último mês"
+        active_alerts=alerts_data["active_alerts"],
+        active_alerts_trend=alerts_data["active_alerts_trend"]
     )
     
     # Obter processos recentes
-    recent_processes = ProcessService.get_recent_processes(db, limit=3)
+    recent_processes = await AsyncProcessService.get_recent_processes(db, limit=3)
     
     # Obter alertas recentes
-    recent_alerts = AlertService.get_recent_alerts(db, limit=3)
+    recent_alerts = await AsyncAlertService.get_recent_alerts(db, limit=3)
     
     return DashboardData(
         metrics=metrics,
@@ -0,0 +1,32 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.database import get_async_db
+from app.core.security import get_current_active_user
+from app.services.export import MEDIA_TYPES, export_metrics
+from app.schemas.schemas import User
+
+router = APIRouter()
+
+@router.get("/")
+async def export_environmental_metrics(
+    format: str = "csv",
+    metric_type: Optional[str] = None,
+    location_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be 'csv', 'arrow' or 'parquet'")
+    # A exportação abre a própria sessão; liberar a conexão da requisição
+    await db.close()
+    filename = f"environmental_metrics.{format}"
+    return StreamingResponse(
+        export_metrics(format, metric_type, location_id, since, until),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,25 +1,83 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.pagination import set_page_headers
 from app.core.security import get_current_active_user
-from app.services.services import EnvironmentalMetricService
-from app.schemas.schemas import EnvironmentalMetric, EnvironmentalMetricCreate, User
+from app.core.serialization import expanded_response, fast_columns, rows_response
+from app.models.models import EnvironmentalMetric as EnvironmentalMetricModel
+from app.services.async_services import AsyncEnvironmentalMetricService, AsyncMetricRollupService
+from app.services.rollups import normalize_timestamp
+from app.services.services import parse_expand
+from app.schemas.schemas import EnvironmentalMetric, EnvironmentalMetricBatchResult, EnvironmentalMetricExpanded, EnvironmentalMetricCreate, MetricSeries, User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[EnvironmentalMetric])
 async def get_flora_fauna_metrics(
+    response: Response,
     location_id: int = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(settings.METRICS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.METRICS_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    expand: Optional[str] = Query(None, description="Relacionamentos incluídos: location"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return EnvironmentalMetricService.get_metrics_by_type(db, "vegetation_cover", location_id)
+    try:
+        relations = parse_expand(EnvironmentalMetricModel, expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    columns = None if relations else fast_columns(EnvironmentalMetricModel, EnvironmentalMetric)
+    try:
+        metrics = await AsyncEnvironmentalMetricService.get_metrics_by_type(
+            db, "vegetation_cover", location_id, since=since, until=until, limit=limit, cursor=cursor, columns=columns,
+            expand=relations
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_page_headers(response, metrics, limit, "recorded_at", "id")
+    if relations:
+        return expanded_response(EnvironmentalMetricExpanded, metrics, relations, response)
+    if columns:
+        return rows_response(EnvironmentalMetric, metrics, response)
+    return metrics
 
 @router.post("/", response_model=EnvironmentalMetric)
 async def create_flora_fauna_metric(
     metric: EnvironmentalMetricCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return EnvironmentalMetricService.create_metric(db=db, metric=metric)
+    return await AsyncEnvironmentalMetricService.create_metric(db=db, metric=metric)
+
+@router.post("/batch", response_model=EnvironmentalMetricBatchResult)
+async def create_flora_fauna_metrics_batch(
+    items: List[Any] = Body(...),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if len(items) > settings.METRICS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.METRICS_BATCH_MAX_SIZE} items)"
+        )
+    return await AsyncEnvironmentalMetricService.create_metrics_batch(db=db, items=items)
+
+@router.get("/series", response_model=MetricSeries)
+async def get_flora_fauna_metric_series(
+    location_id: int = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    max_points: int = Query(500, ge=1, le=10000),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    until = normalize_timestamp(until) if until else datetime.utcnow()
+    since = normalize_timestamp(since) if since else until - timedelta(days=30)
+    if since > until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'")
+    return await AsyncMetricRollupService.get_series(db, "vegetation_cover", since, until, max_points, location_id)
@@ -1,37 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.database import get_async_db
+from app.core.conditional import collection_etag, not_modified, row_etag, set_validators
+from app.core.pagination import set_page_headers
 from app.core.security import get_current_active_user
-from app.services.services import LocationService
-from app.schemas.schemas import Location, LocationCreate, LocationUpdate, User
+from app.models.models import Location as LocationModel
+from app.services.async_services import AsyncLocationService, AsyncResourceVersionService, estimate_count
+from app.services.versions import LOCATIONS
+from app.schemas.schemas import Location, LocationCreate, LocationUpdate, NearbyLocation, User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Location])
 async def get_locations(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return LocationService.get_locations(db, skip=skip, limit=limit)
+    version, last_modified = await AsyncResourceVersionService.get(db, LOCATIONS)
+    etag = collection_etag(LOCATIONS, version, request)
+    cached = not_modified(request, etag, last_modified)
+    if cached:
+        return cached
+    try:
+        locations = await AsyncLocationService.get_locations(db, skip=skip, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    total = await estimate_count(db, LocationModel) if include_total else None
+    set_page_headers(response, locations, limit, "id", total=total)
+    set_validators(response, etag, last_modified)
+    return locations
 
 @router.post("/", response_model=Location)
 async def create_location(
     location: LocationCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return LocationService.create_location(db=db, location=location)
+    return await AsyncLocationService.create_location(db=db, location=location)
+
+@router.get("/nearby", response_model=List[NearbyLocation])
+async def get_nearby_locations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(10, gt=0, le=500, description="Raio em km"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    nearby = await AsyncLocationService.get_nearby_locations(db, lat, lon, radius, limit=limit)
+    return [
+        NearbyLocation(**Location.model_validate(location).dict(), distance_km=distance)
+        for location, distance in nearby
+    ]
+
+@router.get("/bbox", response_model=List[Location])
+async def get_locations_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(1000, ge=1, le=10000),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    return await AsyncLocationService.get_locations_in_bbox(db, min_lat, min_lon, max_lat, max_lon, limit=limit)
 
 @router.get("/{location_id}", response_model=Location)
 async def get_location(
     location_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    location = LocationService.get_location_by_id(db, location_id=location_id)
+    version, _ = await AsyncResourceVersionService.get(db, LOCATIONS)
+    location = await AsyncLocationService.get_location_by_id(db, location_id=location_id)
     if location is None:
         raise HTTPException(status_code=404, detail="Location not found")
+    etag = row_etag(LOCATIONS, version, location.id, location.created_at)
+    cached = not_modified(request, etag, location.created_at)
+    if cached:
+        return cached
+    set_validators(response, etag, location.created_at)
     return location
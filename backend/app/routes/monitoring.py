@@ -1,28 +1,131 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.pagination import set_page_headers
 from app.core.security import get_current_active_user
-from app.services.services import EnvironmentalMetricService
-from app.schemas.schemas import EnvironmentalMetric, EnvironmentalMetricCreate, User
+from app.core.serialization import expanded_response, fast_columns, numpy_response, rows_response
+from app.models.models import EnvironmentalMetric as EnvironmentalMetricModel
+from app.services.analytics import ANALYTICS_METRIC_TYPES, AnalyticsBusyError, AnalyticsTooLargeError, run_analytics
+from app.services.async_services import AsyncEnvironmentalMetricService, AsyncMetricRollupService
+from app.services.rollups import normalize_timestamp
+from app.services.services import parse_expand
+from app.schemas.schemas import EnvironmentalMetric, EnvironmentalMetricBatchResult, EnvironmentalMetricCreate, EnvironmentalMetricExpanded, MetricAnalytics, MetricSeries, User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[EnvironmentalMetric])
 async def get_metrics(
+    response: Response,
     metric_type: str = None,
     location_id: int = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(settings.METRICS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.METRICS_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    expand: Optional[str] = Query(None, description="Relacionamentos incluídos: location"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if metric_type:
-        return EnvironmentalMetricService.get_metrics_by_type(db, metric_type, location_id)
-    return []
+    if not metric_type:
+        return []
+    try:
+        relations = parse_expand(EnvironmentalMetricModel, expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    columns = None if relations else fast_columns(EnvironmentalMetricModel, EnvironmentalMetric)
+    try:
+        metrics = await AsyncEnvironmentalMetricService.get_metrics_by_type(
+            db, metric_type, location_id, since=since, until=until, limit=limit, cursor=cursor, columns=columns,
+            expand=relations
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_page_headers(response, metrics, limit, "recorded_at", "id")
+    if relations:
+        return expanded_response(EnvironmentalMetricExpanded, metrics, relations, response)
+    if columns:
+        return rows_response(EnvironmentalMetric, metrics, response)
+    return metrics
 
 @router.post("/", response_model=EnvironmentalMetric)
 async def create_metric(
     metric: EnvironmentalMetricCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return EnvironmentalMetricService.create_metric(db=db, metric=metric)
+    return await AsyncEnvironmentalMetricService.create_metric(db=db, metric=metric)
+
+@router.post("/batch", response_model=EnvironmentalMetricBatchResult)
+async def create_metrics_batch(
+    items: List[Any] = Body(...),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if len(items) > settings.METRICS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.METRICS_BATCH_MAX_SIZE} items)"
+        )
+    return await AsyncEnvironmentalMetricService.create_metrics_batch(db=db, items=items)
+
+@router.get("/series", response_model=MetricSeries)
+async def get_metric_series(
+    metric_type: str,
+    location_id: int = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    max_points: int = Query(500, ge=1, le=10000),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    until = normalize_timestamp(until) if until else datetime.utcnow()
+    since = normalize_timestamp(since) if since else until - timedelta(days=30)
+    if since > until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'")
+    return await AsyncMetricRollupService.get_series(db, metric_type, since, until, max_points, location_id)
+
+@router.get("/analytics", response_model=MetricAnalytics)
+async def get_metric_analytics(
+    metric_type: str,
+    location_id: int = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    window: int = Query(24, ge=2, le=settings.ANALYTICS_MAX_WINDOW, description="Observações por janela"),
+    min_periods: Optional[int] = Query(None, ge=1, description="Padrão: o tamanho da janela"),
+    z_threshold: float = Query(3.0, gt=0),
+    percentiles: List[float] = Query([5, 50, 95]),
+    anomalies_only: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    if metric_type not in ANALYTICS_METRIC_TYPES:
+        raise HTTPException(status_code=400, detail=f"metric_type must be one of {', '.join(ANALYTICS_METRIC_TYPES)}")
+    if any(not 0 <= percentile <= 100 for percentile in percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    min_periods = min_periods or window
+    if min_periods > window:
+        raise HTTPException(status_code=400, detail="'min_periods' must not exceed 'window'")
+    until = normalize_timestamp(until) if until else datetime.utcnow()
+    since = normalize_timestamp(since) if since else until - timedelta(days=7)
+    if since > until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'")
+    try:
+        series = await run_analytics(
+            metric_type=metric_type, since=since, until=until, location_id=location_id, window=window,
+            min_periods=min_periods, z_threshold=z_threshold, percentiles=percentiles, anomalies_only=anomalies_only
+        )
+    except AnalyticsTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except AnalyticsBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+    return numpy_response({
+        "metric_type": metric_type,
+        "since": since,
+        "until": until,
+        "window": window,
+        "min_periods": min_periods,
+        "z_threshold": z_threshold,
+        "series": series
+    })
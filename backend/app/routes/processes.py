@@ -1,40 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.conditional import collection_etag, not_modified, row_etag, set_validators
+from app.core.pagination import set_page_headers
 from app.core.security import get_current_active_user
-from app.services.services import ProcessService
-from app.schemas.schemas import Process, ProcessCreate, ProcessUpdate, User
+from app.core.serialization import expanded_response, fast_columns, rows_response
+from app.models.models import Process as ProcessModel
+from app.services.async_services import AsyncProcessService, AsyncResourceVersionService, AsyncSearchService, estimate_count
+from app.services.services import parse_expand
+from app.services.versions import LOCATIONS, PROCESSES, USERS
+from app.schemas.schemas import Process, ProcessCreate, ProcessExpanded, ProcessSearchResult, ProcessUpdate, User
 
 router = APIRouter()
 
+# Recurso de cada relacionamento expandido, cuja versão também entra no ETag da lista
+EXPAND_VERSIONS = {"created_by": USERS, "location": LOCATIONS}
+
 @router.get("/", response_model=List[Process])
 async def get_processes(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    expand: Optional[str] = Query(None, description="Relacionamentos incluídos, separados por vírgula: created_by, location"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    processes = ProcessService.get_processes(db, skip=skip, limit=limit)
+    try:
+        relations = parse_expand(ProcessModel, expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    version, last_modified = await AsyncResourceVersionService.get(db, PROCESSES)
+    related = [await AsyncResourceVersionService.get(db, EXPAND_VERSIONS[name]) for name in relations]
+    etag = collection_etag(PROCESSES, version, request, [related_version for related_version, _ in related])
+    last_modified = max(filter(None, [last_modified, *(changed_at for _, changed_at in related)]), default=None)
+    cached = not_modified(request, etag, last_modified)
+    if cached:
+        return cached
+    columns = None if relations else fast_columns(ProcessModel, Process)
+    try:
+        processes = await AsyncProcessService.get_processes(
+            db, skip=skip, limit=limit, cursor=cursor, columns=columns, expand=relations
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    total = await estimate_count(db, ProcessModel) if include_total else None
+    set_page_headers(response, processes, limit, "id", total=total)
+    set_validators(response, etag, last_modified)
+    if relations:
+        return expanded_response(ProcessExpanded, processes, relations, response)
+    if columns:
+        return rows_response(Process, processes, response)
     return processes
 
 @router.post("/", response_model=Process)
 async def create_process(
     process: ProcessCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await AsyncProcessService.create_process(db=db, process=process, user_id=current_user.id)
+
+@router.get("/search", response_model=List[ProcessSearchResult])
+async def search_processes(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(settings.SEARCH_PAGE_DEFAULT_LIMIT, ge=1, le=settings.SEARCH_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return ProcessService.create_process(db=db, process=process, user_id=current_user.id)
+    try:
+        results = await AsyncSearchService.search(db, ProcessModel, q, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_page_headers(response, results, limit, "score", "id")
+    return results
 
 @router.get("/{process_id}", response_model=Process)
 async def get_process(
     process_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    process = ProcessService.get_process_by_id(db, process_id=process_id)
+    version, _ = await AsyncResourceVersionService.get(db, PROCESSES)
+    process = await AsyncProcessService.get_process_by_id(db, process_id=process_id)
     if process is None:
         raise HTTPException(status_code=404, detail="Process not found")
+    changed_at = process.updated_at or process.created_at
+    etag = row_etag(PROCESSES, version, process.id, changed_at)
+    cached = not_modified(request, etag, changed_at)
+    if cached:
+        return cached
+    set_validators(response, etag, changed_at)
     return process
 
 @router.put("/{process_id}", response_model=Process)
@@ -42,17 +106,9 @@ async def update_process(
     process_id: int,
     process_update: ProcessUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    process = ProcessService.get_process_by_id(db, process_id=process_id)
+    process = await AsyncProcessService.update_process(db, process_id=process_id, process_update=process_update)
     if process is None:
         raise HTTPException(status_code=404, detail="Process not found")
-    
-    # Atualizar campos
-    update_data = process_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(process, field, value)
-    
-    db.commit()
-    db.refresh(process)
     return process
@@ -1,26 +1,67 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_active_user
-from app.services.services import UserService
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.database import get_async_db
+from app.core.conditional import collection_etag, not_modified, set_validators
+from app.core.pagination import set_page_headers
+from app.core.security import get_current_active_user, get_current_admin_user, get_password_hash_async
+from app.models.models import User as UserModel
+from app.services.async_services import AsyncResourceVersionService, AsyncUserService, estimate_count
+from app.services.versions import USERS
 from app.schemas.schemas import User, UserCreate, UserUpdate
 
 router = APIRouter()
 
 @router.get("/", response_model=List[User])
 async def get_team_members(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return UserService.get_users(db, skip=skip, limit=limit)
+    version, last_modified = await AsyncResourceVersionService.get(db, USERS)
+    etag = collection_etag(USERS, version, request)
+    cached = not_modified(request, etag, last_modified)
+    if cached:
+        return cached
+    try:
+        users = await AsyncUserService.get_users(db, skip=skip, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    total = await estimate_count(db, UserModel) if include_total else None
+    set_page_headers(response, users, limit, "id", total=total)
+    set_validators(response, etag, last_modified)
+    return users
 
 @router.post("/", response_model=User)
 async def create_team_member(
     user: UserCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return UserService.create_user(db=db, user=user)
+    await db.close()
+    hashed_password = await get_password_hash_async(user.password)
+    return await AsyncUserService.create_user(db=db, user=user, hashed_password=hashed_password)
+
+@router.put("/{user_id}", response_model=User)
+async def update_team_member(
+    user_id: int,
+    user_update: UserUpdate,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Um administrador não rebaixa nem desativa a própria conta por aqui
+    changes = user_update.model_dump(exclude_unset=True)
+    if user_id == current_user.id and ("role" in changes or "is_active" in changes):
+        raise HTTPException(status_code=400, detail="Cannot change your own role or active status")
+    try:
+        user = await AsyncUserService.update_user(db, user_id=user_id, user_update=user_update)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
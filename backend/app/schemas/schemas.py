@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
-from app.models.models import UserRole, ProcessStatus, AlertType
+from app.models.models import UserRole, ProcessStatus, AlertType, AlertRuleKind, AlertRuleOperator
 
 # User Schemas
 class UserBase(BaseModel):
@@ -58,6 +58,9 @@ class Process(ProcessBase):
     class Config:
         from_attributes = True
 
+class ProcessSearchResult(Process):
+    score: float
+
 # Location Schemas
 class LocationBase(BaseModel):
     name: str
@@ -83,6 +86,14 @@ class Location(LocationBase):
     class Config:
         from_attributes = True
 
+class NearbyLocation(Location):
+    distance_km: float
+
+# Relacionamentos incluídos só quando pedidos em expand= (ver services.EXPANDABLE)
+class ProcessExpanded(Process):
+    created_by: Optional[User] = None
+    location: Optional[Location] = None
+
 # Alert Schemas
 class AlertBase(BaseModel):
     title: str
@@ -109,6 +120,46 @@ class Alert(AlertBase):
     class Config:
         from_attributes = True
 
+class AlertSearchResult(Alert):
+    score: float
+
+class AlertExpanded(Alert):
+    user: Optional[User] = None
+    location: Optional[Location] = None
+
+class AlertBulkAcknowledge(BaseModel):
+    # Ids explícitos e/ou filtros; os critérios informados são combinados com AND
+    ids: Optional[List[int]] = None
+    location_id: Optional[int] = None
+    alert_type: Optional[AlertType] = None
+    created_before: Optional[datetime] = None
+
+class AlertBulkAcknowledgeResult(BaseModel):
+    updated: int
+
+# Alert Rule Schemas
+class AlertRuleBase(BaseModel):
+    name: str
+    metric_type: str
+    location_id: Optional[int] = None
+    kind: AlertRuleKind = AlertRuleKind.THRESHOLD
+    operator: AlertRuleOperator = AlertRuleOperator.ABOVE
+    threshold: float
+    alert_type: AlertType = AlertType.WARNING
+    cooldown_minutes: int = 60
+
+class AlertRuleCreate(AlertRuleBase):
+    pass
+
+class AlertRule(AlertRuleBase):
+    id: int
+    is_active: bool
+    created_by_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Environmental Metric Schemas
 class EnvironmentalMetricBase(BaseModel):
     metric_type: str
@@ -117,7 +168,7 @@ class EnvironmentalMetricBase(BaseModel):
     location_id: int
 
 class EnvironmentalMetricCreate(EnvironmentalMetricBase):
-    pass
+    recorded_at: Optional[datetime] = None
 
 class EnvironmentalMetric(EnvironmentalMetricBase):
     id: int
@@ -126,6 +177,69 @@ class EnvironmentalMetric(EnvironmentalMetricBase):
     class Config:
         from_attributes = True
 
+class EnvironmentalMetricExpanded(EnvironmentalMetric):
+    location: Optional[Location] = None
+
+class EnvironmentalMetricBatchError(BaseModel):
+    index: int
+    detail: str
+
+class EnvironmentalMetricBatchResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[EnvironmentalMetricBatchError] = []
+
+class MetricSeriesPoint(BaseModel):
+    bucket_start: datetime
+    min: float
+    max: float
+    mean: float
+    count: int
+    last: float
+
+class MetricSeries(BaseModel):
+    metric_type: str
+    location_id: Optional[int] = None
+    resolution: str
+    since: datetime
+    until: datetime
+    points: List[MetricSeriesPoint]
+
+class MetricAnalyticsSeries(BaseModel):
+    location_id: int
+    count: int
+    anomalies: int
+    # Colunas alinhadas por posição; estatísticas nulas até a janela ter min_periods pontos
+    recorded_at: List[datetime]
+    value: List[float]
+    mean: List[Optional[float]]
+    std: List[Optional[float]]
+    percentiles: Dict[str, List[Optional[float]]]
+    z_score: List[Optional[float]]
+    is_anomaly: List[bool]
+
+class MetricAnalytics(BaseModel):
+    metric_type: str
+    since: datetime
+    until: datetime
+    window: int
+    min_periods: int
+    z_threshold: float
+    series: List[MetricAnalyticsSeries]
+
+class MetricUploadProgress(BaseModel):
+    upload_id: Optional[str] = None
+    format: str
+    status: str
+    rows_read: int
+    inserted: int
+    failed: int
+    chunks_committed: int
+    errors: List[EnvironmentalMetricBatchError] = []
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
 # Authentication Schemas
 class Token(BaseModel):
     access_token: str
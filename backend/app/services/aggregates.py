@@ -0,0 +1,232 @@
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.models import Alert, EnvironmentalMetric, MetricRollupMonthly
+from app.services.rollups import normalize_timestamp
+
+# Tipos exibidos no dashboard
+DASHBOARD_METRIC_TYPES = ("air_quality", "water_quality", "vegetation_cover")
+
+Month = Tuple[int, int]
+
+
+def _month_of(value: datetime) -> Month:
+    return (value.year, value.month)
+
+
+def _previous_month(month: Month) -> Month:
+    year, number = month
+    return (year - 1, 12) if number == 1 else (year, number - 1)
+
+
+def _month_start(month: Month) -> datetime:
+    return datetime(month[0], month[1], 1)
+
+
+class _MetricAggregate:
+    def __init__(self):
+        self.unit: Optional[str] = None
+        # Última leitura por localização: (recorded_at, value)
+        self.latest: Dict[int, Tuple[datetime, float]] = {}
+        self.latest_sum = 0.0
+        # Soma e contagem por mês, apenas mês corrente e anterior
+        self.months: Dict[Month, list] = {}
+
+    def record(self, location_id: int, value: float, unit: Optional[str], recorded_at: datetime) -> None:
+        self.unit = unit or self.unit
+        current = self.latest.get(location_id)
+        if current is None or recorded_at >= current[0]:
+            self.latest_sum += value - (current[1] if current else 0.0)
+            self.latest[location_id] = (recorded_at, value)
+        self.add_month(_month_of(recorded_at), value, 1)
+
+    def add_month(self, month: Month, total: float, count: int) -> None:
+        bucket = self.months.setdefault(month, [0.0, 0])
+        bucket[0] += total
+        bucket[1] += count
+
+    def current_value(self) -> Optional[float]:
+        if not self.latest:
+            return None
+        return self.latest_sum / len(self.latest)
+
+    def month_mean(self, month: Month) -> Optional[float]:
+        bucket = self.months.get(month)
+        if not bucket or not bucket[1]:
+            return None
+        return bucket[0] / bucket[1]
+
+    def prune(self, month: Month) -> None:
+        keep = {month, _previous_month(month)}
+        for key in [key for key in self.months if key not in keep]:
+            del self.months[key]
+
+
+class DashboardAggregates:
+    """Agregados do dashboard mantidos em memória e atualizados a cada escrita.
+
+    Cada worker só vê as próprias escritas; ``reload`` relê o estado do banco e
+    é chamado periodicamente para incorporar o que os outros gravaram.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Escritas que chegam durante uma carga, reaplicadas sobre o estado novo
+        self._pending: Optional[List[Callable[[], None]]] = None
+        self._metrics: Dict[str, _MetricAggregate] = {}
+        self._alerts_by_month: Dict[Month, int] = {}
+
+    def ensure_loaded(self, db: Session) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+        self.reload(db)
+
+    def reload(self, db: Session) -> None:
+        with self._lock:
+            if self._pending is not None and self._loaded:
+                # Outra carga em andamento; até ela terminar vale o estado atual
+                return
+            if self._pending is None:
+                self._pending = []
+        # As consultas rodam fora do lock: sob AsyncSession elas cedem o event loop,
+        # e outra corrotina na mesma thread não pode ficar presa esperando o lock
+        try:
+            state = self._read_state(db)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            if self._pending is None and self._loaded:
+                # Uma carga concorrente já instalou o estado
+                return
+            self._metrics, self._alerts_by_month = state
+            # Uma escrita confirmada antes das consultas pode contar duas vezes nas
+            # médias do mês até a próxima recarga; perdê-la seria pior
+            for apply in self._pending or ():
+                apply()
+            self._pending = None
+            self._loaded = True
+
+    def _record(self, apply: Callable[[], None]) -> None:
+        # Sem estado nem carga em andamento, a escrita já estará na próxima carga
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(apply)
+            if self._loaded:
+                apply()
+
+    def _read_state(self, db: Session) -> tuple:
+        # Carga inicial a partir dos rollups mensais e da última leitura por localização
+        month = _month_of(datetime.utcnow())
+        previous_start = _month_start(_previous_month(month))
+        metrics = {metric_type: _MetricAggregate() for metric_type in DASHBOARD_METRIC_TYPES}
+
+        monthly = db.query(
+            MetricRollupMonthly.metric_type,
+            MetricRollupMonthly.bucket_start,
+            func.sum(MetricRollupMonthly.sum),
+            func.sum(MetricRollupMonthly.count)
+        ).filter(
+            MetricRollupMonthly.metric_type.in_(DASHBOARD_METRIC_TYPES),
+            MetricRollupMonthly.bucket_start >= previous_start
+        ).group_by(MetricRollupMonthly.metric_type, MetricRollupMonthly.bucket_start)
+        for metric_type, bucket_start, total, count in monthly:
+            metrics[metric_type].add_month(_month_of(bucket_start), total, count)
+
+        latest_at = db.query(
+            EnvironmentalMetric.metric_type,
+            EnvironmentalMetric.location_id,
+            func.max(EnvironmentalMetric.recorded_at).label("recorded_at")
+        ).filter(
+            EnvironmentalMetric.metric_type.in_(DASHBOARD_METRIC_TYPES)
+        ).group_by(EnvironmentalMetric.metric_type, EnvironmentalMetric.location_id).subquery()
+        latest = db.query(EnvironmentalMetric).join(
+            latest_at,
+            (EnvironmentalMetric.metric_type == latest_at.c.metric_type)
+            & (EnvironmentalMetric.location_id == latest_at.c.location_id)
+            & (EnvironmentalMetric.recorded_at == latest_at.c.recorded_at)
+        )
+        for metric in latest:
+            aggregate = metrics[metric.metric_type]
+            aggregate.unit = metric.unit
+            current = aggregate.latest.get(metric.location_id)
+            if current is None:
+                aggregate.latest[metric.location_id] = (normalize_timestamp(metric.recorded_at), metric.value)
+                aggregate.latest_sum += metric.value
+
+        alerts_by_month = {}
+        for created_month in (month, _previous_month(month)):
+            start = _month_start(created_month)
+            end = _month_start((created_month[0] + created_month[1] // 12, created_month[1] % 12 + 1))
+            alerts_by_month[created_month] = db.query(func.count(Alert.id)).filter(
+                Alert.created_at >= start, Alert.created_at < end
+            ).scalar()
+        return metrics, alerts_by_month
+
+    def record_metrics(self, metrics: Iterable[dict]) -> None:
+        metrics = list(metrics)
+        self._record(lambda: self._apply_metrics(metrics))
+
+    def _apply_metrics(self, metrics: List[dict]) -> None:
+        month = _month_of(datetime.utcnow())
+        for metric in metrics:
+            aggregate = self._metrics.get(metric["metric_type"])
+            if aggregate is None:
+                continue
+            aggregate.record(metric["location_id"], metric["value"], metric.get("unit"), metric["recorded_at"])
+        for aggregate in self._metrics.values():
+            aggregate.prune(month)
+
+    def record_alert_created(self, created_at: Optional[datetime]) -> None:
+        month = _month_of(normalize_timestamp(created_at) if created_at else datetime.utcnow())
+        self._record(lambda: self._apply_alert_created(month))
+
+    def _apply_alert_created(self, month: Month) -> None:
+        self._alerts_by_month[month] = self._alerts_by_month.get(month, 0) + 1
+
+    def metrics_snapshot(self, db: Session) -> Dict[str, dict]:
+        self.ensure_loaded(db)
+        month = _month_of(datetime.utcnow())
+        with self._lock:
+            snapshot = {}
+            for metric_type, aggregate in self._metrics.items():
+                snapshot[metric_type] = {
+                    "value": aggregate.current_value(),
+                    "unit": aggregate.unit,
+                    "month_mean": aggregate.month_mean(month),
+                    "previous_month_mean": aggregate.month_mean(_previous_month(month))
+                }
+            return snapshot
+
+    def alerts_snapshot(self, db: Session) -> dict:
+        self.ensure_loaded(db)
+        month = _month_of(datetime.utcnow())
+        with self._lock:
+            return {
+                "created_this_month": self._alerts_by_month.get(month, 0),
+                "created_last_month": self._alerts_by_month.get(_previous_month(month), 0)
+            }
+
+
+dashboard_aggregates = DashboardAggregates()
+
+
+def format_metric_value(value: Optional[float], unit: Optional[str]) -> str:
+    if value is None:
+        return "Sem dados"
+    if unit == "%":
+        return f"{value:.0f}%"
+    return f"{value:.1f} {unit}" if unit else f"{value:.1f}"
+
+
+def format_trend(current: Optional[float], previous: Optional[float]) -> str:
+    if current is None:
+        return "Sem dados do mês atual"
+    if not previous:
+        return "Sem dados do último mês"
+    return f"{(current - previous) / abs(previous) * 100:+.0f}% desde último mês"
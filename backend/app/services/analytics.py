@@ -0,0 +1,263 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+import numpy as np
+from sqlalchemy import BigInteger, String, cast, func, select, type_coerce
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import EnvironmentalMetric
+from app.services.rollups import normalize_timestamp
+
+ANALYTICS_METRIC_TYPES = ("air_quality", "water_quality", "vegetation_cover")
+
+# Linhas de janelas ordenadas por vez no cálculo de percentis (limita a memória a ~32 MB)
+_PERCENTILE_CHUNK_CELLS = 4_000_000
+# Erro relativo aceito na diferença das somas acumuladas dos quadrados
+_CANCELLATION_TOLERANCE = 64 * np.finfo(np.float64).eps
+
+
+class AnalyticsBusyError(RuntimeError):
+    pass
+
+
+class AnalyticsTooLargeError(ValueError):
+    pass
+
+
+def _series_bounds(locations: np.ndarray):
+    # Linhas ordenadas por (location_id, recorded_at): cada série é um trecho contíguo
+    starts = np.flatnonzero(np.r_[True, locations[1:] != locations[:-1]]) if len(locations) else np.empty(0, np.int64)
+    ends = np.r_[starts[1:], len(locations)].astype(np.int64)
+    return starts, ends
+
+
+def _window_moments(centered: np.ndarray, end: np.ndarray, count: np.ndarray):
+    # Soma e soma dos quadrados de centered[end - count:end] via somas acumuladas
+    sums = np.r_[0.0, np.cumsum(centered)]
+    squares = np.r_[0.0, np.cumsum(centered * centered)]
+    begin = end - count
+    total = sums[end] - sums[begin]
+    total_squares = squares[end] - squares[begin]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        deviation = total_squares - total * mean
+        # Abaixo do erro de arredondamento das somas acumuladas a janela é constante:
+        # sem isso, um resíduo de ~1e-12 vira desvio e gera z-scores enormes
+        deviation = np.where(deviation <= squares[end] * _CANCELLATION_TOLERANCE, 0.0, deviation)
+        variance = deviation / (count - 1)
+    return mean, np.sqrt(np.maximum(variance, 0.0))
+
+
+def _rolling_percentiles(
+    values: np.ndarray, series_index: np.ndarray, count: np.ndarray, window: int, percentiles: Sequence[float]
+) -> np.ndarray:
+    # Cada série ganha window-1 NaN à frente: nenhuma janela atravessa a série anterior
+    n = len(values)
+    padded_positions = np.arange(n) + (series_index + 1) * (window - 1)
+    padded = np.full(n + (series_index[-1] + 1) * (window - 1), np.nan)
+    padded[padded_positions] = values
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+
+    quantiles = np.asarray(percentiles, dtype=np.float64) / 100
+    result = np.full((len(quantiles), n), np.nan)
+    chunk = max(1, _PERCENTILE_CHUNK_CELLS // window)
+    for offset in range(0, n, chunk):
+        rows = slice(offset, offset + chunk)
+        # Janela terminando em cada linha; NaN vira +inf e vai para o fim ao ordenar
+        block = np.sort(np.nan_to_num(windows[padded_positions[rows] - window + 1], nan=np.inf), axis=1)
+        # As count posições válidas ficam à direita da janela, mas após a ordenação ocupam o início
+        valid = count[rows]
+        ranks = quantiles[:, None] * (valid - 1)
+        lower = np.floor(ranks).astype(np.int64)
+        upper = np.minimum(lower + 1, valid - 1)
+        fraction = ranks - lower
+        low_values = np.take_along_axis(block, lower.T, axis=1).T
+        high_values = np.take_along_axis(block, upper.T, axis=1).T
+        result[:, rows] = low_values + (high_values - low_values) * fraction
+    return result
+
+
+def windowed_statistics(
+    locations: np.ndarray,
+    values: np.ndarray,
+    window: int,
+    min_periods: int,
+    z_threshold: float,
+    percentiles: Sequence[float] = ()
+) -> Dict[str, np.ndarray]:
+    """Estatísticas móveis de todas as séries de uma vez.
+
+    ``locations`` e ``values`` vêm ordenados por (location_id, recorded_at). A
+    janela tem ``window`` observações e termina na própria linha; média, desvio
+    e percentis ficam NaN enquanto a série tiver menos de ``min_periods``
+    pontos. O z-score compara cada valor com a janela anterior a ele, para que
+    um pico não amorteça o próprio escore.
+    """
+    n = len(values)
+    if n == 0:
+        empty = np.empty(0)
+        result = {"mean": empty, "std": empty, "z_score": empty, "is_anomaly": np.empty(0, dtype=bool)}
+        if percentiles:
+            result["percentiles"] = np.empty((len(percentiles), 0))
+        return result
+    starts, ends = _series_bounds(locations)
+    lengths = ends - starts
+    series_index = np.repeat(np.arange(len(starts)), lengths)
+    position = np.arange(n) - np.repeat(starts, lengths)
+    end = np.arange(1, n + 1)
+
+    # Centrar cada série na própria média reduz o cancelamento nas somas acumuladas
+    offsets = np.add.reduceat(values, starts) / lengths
+    centered = values - np.repeat(offsets, lengths)
+    offset = np.repeat(offsets, lengths)
+
+    count = np.minimum(position + 1, window)
+    mean, std = _window_moments(centered, end, count)
+    ready = count >= min_periods
+    mean = np.where(ready, mean + offset, np.nan)
+    std = np.where(ready & (count > 1), std, np.nan)
+
+    previous_count = np.minimum(position, window)
+    previous_mean, previous_std = _window_moments(centered, end - 1, previous_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (centered - previous_mean) / previous_std
+    # Janela constante (desvio zero) não tem escore definido
+    z_score = np.where((previous_count >= max(min_periods, 2)) & (previous_std > 0), z_score, np.nan)
+    with np.errstate(invalid="ignore"):
+        is_anomaly = np.abs(z_score) >= z_threshold
+
+    result = {"mean": mean, "std": std, "z_score": z_score, "is_anomaly": is_anomaly}
+    if percentiles:
+        rolling = _rolling_percentiles(values, series_index, count, window, percentiles)
+        rolling[:, ~ready] = np.nan
+        result["percentiles"] = rolling
+    return result
+
+
+def _stamp_column(db: Session):
+    # Evita criar um datetime por linha: o NumPy converte o texto gravado pelo SQLite
+    # (UTC, "YYYY-MM-DD HH:MM:SS[.ffffff]"); nos demais bancos vem o epoch em microssegundos
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(EnvironmentalMetric.recorded_at, String)
+    return cast(func.extract("epoch", EnvironmentalMetric.recorded_at) * 1000000, BigInteger)
+
+
+def _percentile_label(percentile: float) -> str:
+    return f"p{percentile:g}".replace(".", "_")
+
+
+class MetricAnalyticsService:
+    @staticmethod
+    def load_series(
+        db: Session,
+        metric_type: str,
+        since: datetime,
+        until: datetime,
+        location_id: Optional[int] = None,
+        max_rows: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        # Uma única consulta na ordem do índice (metric_type, location_id, recorded_at)
+        max_rows = max_rows or settings.ANALYTICS_MAX_ROWS
+        query = select(EnvironmentalMetric.location_id, _stamp_column(db), EnvironmentalMetric.value).where(
+            EnvironmentalMetric.metric_type == metric_type,
+            EnvironmentalMetric.recorded_at >= normalize_timestamp(since),
+            EnvironmentalMetric.recorded_at < normalize_timestamp(until)
+        )
+        if location_id:
+            query = query.where(EnvironmentalMetric.location_id == location_id)
+        query = query.order_by(EnvironmentalMetric.location_id, EnvironmentalMetric.recorded_at).limit(max_rows + 1)
+
+        # Core direto, sem o processamento de resultados do ORM (milhares de linhas de três colunas)
+        rows = db.connection().execute(query).all()
+        if len(rows) > max_rows:
+            raise AnalyticsTooLargeError(f"More than {max_rows} metrics in range; narrow it or filter by location")
+        locations, stamps, values = zip(*rows) if rows else ((), (), ())
+        if db.get_bind().dialect.name == "sqlite":
+            stamps = np.array(stamps, dtype="datetime64[us]")
+        else:
+            stamps = np.fromiter(stamps, dtype=np.int64, count=len(rows)).view("datetime64[us]")
+        return {
+            "location_id": np.fromiter(locations, dtype=np.int64, count=len(rows)),
+            "recorded_at": stamps,
+            "value": np.fromiter(values, dtype=np.float64, count=len(rows)),
+        }
+
+    @staticmethod
+    def analyze(
+        series: Dict[str, np.ndarray],
+        window: int,
+        min_periods: int,
+        z_threshold: float,
+        percentiles: Sequence[float] = (),
+        anomalies_only: bool = False
+    ) -> list:
+        # Resultado em colunas por localização (arrays do NumPy, serializados pelo orjson)
+        locations, stamps, values = series["location_id"], series["recorded_at"], series["value"]
+        stats = windowed_statistics(locations, values, window, min_periods, z_threshold, percentiles)
+        starts, ends = _series_bounds(locations)
+        output = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            rows = slice(start, end)
+            if anomalies_only:
+                rows = start + np.flatnonzero(stats["is_anomaly"][rows])
+            output.append({
+                "location_id": int(locations[start]),
+                "count": end - start,
+                "anomalies": int(np.count_nonzero(stats["is_anomaly"][start:end])),
+                "recorded_at": stamps[rows],
+                "value": values[rows],
+                "mean": stats["mean"][rows],
+                "std": stats["std"][rows],
+                "percentiles": {
+                    _percentile_label(percentile): stats["percentiles"][index][rows]
+                    for index, percentile in enumerate(percentiles)
+                },
+                "z_score": stats["z_score"][rows],
+                "is_anomaly": stats["is_anomaly"][rows],
+            })
+        return output
+
+
+def analyze_metrics(
+    metric_type: str,
+    since: datetime,
+    until: datetime,
+    location_id: Optional[int],
+    window: int,
+    min_periods: int,
+    z_threshold: float,
+    percentiles: Sequence[float] = (),
+    anomalies_only: bool = False
+) -> list:
+    # Sessão síncrona própria: carga e cálculo rodam inteiros fora do event loop
+    with SessionLocal() as db:
+        series = MetricAnalyticsService.load_series(db, metric_type, since, until, location_id)
+    return MetricAnalyticsService.analyze(series, window, min_periods, z_threshold, percentiles, anomalies_only)
+
+
+# O NumPy libera o GIL nas operações sobre arrays grandes, então threads bastam e as
+# séries não precisam ser copiadas para outro processo
+_analytics_executor: Optional[ThreadPoolExecutor] = None
+_analytics_pending = 0
+
+
+async def run_analytics(**kwargs) -> list:
+    global _analytics_executor, _analytics_pending
+    if _analytics_pending >= settings.ANALYTICS_QUEUE_LIMIT:
+        raise AnalyticsBusyError("Too many concurrent analytics requests")
+    # Sem pool dedicado (ANALYTICS_WORKERS <= 0) usa o executor padrão do loop, nunca o próprio loop
+    if _analytics_executor is None and settings.ANALYTICS_WORKERS > 0:
+        _analytics_executor = ThreadPoolExecutor(
+            max_workers=settings.ANALYTICS_WORKERS, thread_name_prefix="analytics"
+        )
+    _analytics_pending += 1
+    try:
+        # copy_context mantém a requisição visível para a instrumentação de SQL
+        call = functools.partial(contextvars.copy_context().run, analyze_metrics, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(_analytics_executor, call)
+    finally:
+        _analytics_pending -= 1
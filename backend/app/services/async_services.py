@@ -0,0 +1,44 @@
+import functools
+import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services import services
+from app.services.services import UserService, ProcessService, LocationService, AlertService, AlertRuleService, EnvironmentalMetricService
+from app.services.rollups import MetricRollupService
+from app.services.search import SearchService
+from app.services.versions import ResourceVersionService
+
+
+def _async_variant(method):
+    # Executa o método síncrono via AsyncSession.run_sync: a lógica é a mesma,
+    # mas o I/O passa pelo driver assíncrono sem bloquear o event loop
+    @functools.wraps(method)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(method, *args, **kwargs)
+    return wrapper
+
+
+def _async_service(name: str, service: type) -> type:
+    attrs = {}
+    for attr, value in vars(service).items():
+        if not isinstance(value, staticmethod):
+            continue
+        method = value.__func__
+        parameters = list(inspect.signature(method).parameters)
+        if parameters and parameters[0] == "db":
+            attrs[attr] = staticmethod(_async_variant(method))
+        else:
+            attrs[attr] = value
+    return type(name, (), attrs)
+
+
+AsyncUserService = _async_service("AsyncUserService", UserService)
+AsyncProcessService = _async_service("AsyncProcessService", ProcessService)
+AsyncLocationService = _async_service("AsyncLocationService", LocationService)
+AsyncAlertService = _async_service("AsyncAlertService", AlertService)
+AsyncAlertRuleService = _async_service("AsyncAlertRuleService", AlertRuleService)
+AsyncEnvironmentalMetricService = _async_service("AsyncEnvironmentalMetricService", EnvironmentalMetricService)
+AsyncMetricRollupService = _async_service("AsyncMetricRollupService", MetricRollupService)
+AsyncResourceVersionService = _async_service("AsyncResourceVersionService", ResourceVersionService)
+AsyncSearchService = _async_service("AsyncSearchService", SearchService)
+
+estimate_count = _async_variant(services.estimate_count)
@@ -0,0 +1,70 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import Alert, AlertUnreadCounter
+
+# Linha do contador global na tabela alert_unread_counters
+GLOBAL_COUNTER = 0
+
+
+def unread_deltas(user_ids: Iterable[Optional[int]], delta: int = 1) -> Dict[int, int]:
+    # Cada alerta conta no contador global e no do usuário
+    deltas = Counter()
+    for user_id in user_ids:
+        deltas[GLOBAL_COUNTER] += delta
+        if user_id is not None:
+            deltas[user_id] += delta
+    return dict(deltas)
+
+
+def adjust_unread_counters(db: Session, deltas: Dict[int, int]) -> None:
+    # Upsert incremental na mesma transação da escrita do alerta; não faz commit
+    rows = [{"user_id": user_id, "unread": delta} for user_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    table = AlertUnreadCounter.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+        greatest = func.greatest
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+        greatest = func.max
+    else:
+        raise NotImplementedError(f"Alert counters are not supported on {dialect}")
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={"unread": greatest(table.c.unread + stmt.excluded.unread, 0)}
+    )
+    # Ordem fixa das chaves evita deadlock entre transações concorrentes
+    db.execute(stmt, sorted(rows, key=lambda row: row["user_id"]))
+
+
+def get_unread_count(db: Session, user_id: Optional[int] = None) -> int:
+    key = GLOBAL_COUNTER if user_id is None else user_id
+    unread = db.scalar(select(AlertUnreadCounter.unread).where(AlertUnreadCounter.user_id == key))
+    return max(unread or 0, 0)
+
+
+def reconcile_unread_counters(db: Session) -> Dict[int, int]:
+    # Recalcula os contadores a partir do índice parcial de alertas não lidos
+    if db.get_bind().dialect.name == "postgresql":
+        # Bloqueia os incrementos concorrentes até o commit para não perder atualizações
+        db.execute(text("LOCK TABLE alert_unread_counters IN EXCLUSIVE MODE"))
+    per_user = db.execute(
+        select(Alert.user_id, func.count()).where(Alert.is_read == False).group_by(Alert.user_id)
+    ).all()
+    counters = {GLOBAL_COUNTER: 0}
+    for user_id, count in per_user:
+        counters[GLOBAL_COUNTER] += count
+        if user_id is not None:
+            counters[user_id] = count
+
+    db.execute(delete(AlertUnreadCounter))
+    db.execute(AlertUnreadCounter.__table__.insert(), [
+        {"user_id": user_id, "unread": unread} for user_id, unread in counters.items()
+    ])
+    db.commit()
+    return counters
@@ -0,0 +1,145 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import EnvironmentalMetric
+from app.services.rollups import normalize_timestamp
+
+CSV = "csv"
+ARROW = "arrow"
+PARQUET = "parquet"
+
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    ARROW: "application/vnd.apache.arrow.stream",
+    PARQUET: "application/vnd.apache.parquet",
+}
+
+COLUMNS = ("id", "metric_type", "value", "unit", "location_id", "recorded_at")
+
+ARROW_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("metric_type", pa.string()),
+    ("value", pa.float64()),
+    ("unit", pa.string()),
+    ("location_id", pa.int64()),
+    # Métricas são gravadas em UTC sem fuso (ver rollups.normalize_timestamp)
+    ("recorded_at", pa.timestamp("us", tz="UTC")),
+])
+
+
+class _ChunkSink:
+    # Destino de escrita do pyarrow que acumula os bytes até o próximo envio
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _record_batch(rows) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, ARROW_SCHEMA)],
+        schema=ARROW_SCHEMA
+    )
+
+
+def _csv_chunk(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(
+        (*row[:-1], row[-1].isoformat() if row[-1] else "") for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+
+async def _partitions(
+    metric_type: Optional[str],
+    location_id: Optional[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    chunk_size: int
+) -> AsyncIterator[list]:
+    query = select(*(getattr(EnvironmentalMetric, column) for column in COLUMNS))
+    if metric_type:
+        query = query.where(EnvironmentalMetric.metric_type == metric_type)
+    if location_id:
+        query = query.where(EnvironmentalMetric.location_id == location_id)
+    if since:
+        query = query.where(EnvironmentalMetric.recorded_at >= normalize_timestamp(since))
+    if until:
+        query = query.where(EnvironmentalMetric.recorded_at < normalize_timestamp(until))
+    query = query.order_by(EnvironmentalMetric.recorded_at, EnvironmentalMetric.id)
+
+    # Sessão própria: a resposta continua sendo enviada depois que a rota retorna.
+    # yield_per usa cursor no servidor, então só um lote fica em memória por vez
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def export_metrics(
+    fmt: str,
+    metric_type: Optional[str] = None,
+    location_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    chunk_size = chunk_size or settings.METRICS_EXPORT_CHUNK_SIZE
+    partitions = _partitions(metric_type, location_id, since, until, chunk_size)
+
+    if fmt == CSV:
+        yield _csv_chunk([], header=True)
+        async for rows in partitions:
+            yield _csv_chunk(rows)
+        return
+
+    sink = _ChunkSink()
+    if fmt == ARROW:
+        writer = pa.ipc.new_stream(sink, ARROW_SCHEMA)
+        write = writer.write_batch
+    elif fmt == PARQUET:
+        writer = pq.ParquetWriter(sink, ARROW_SCHEMA, compression="snappy")
+        # Cada lote vira um row group, escrito assim que fica pronto
+        write = lambda batch: writer.write_batch(batch, row_group_size=batch.num_rows)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    try:
+        async for rows in partitions:
+            write(_record_batch(rows))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
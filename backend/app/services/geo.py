@@ -0,0 +1,53 @@
+import math
+from typing import List, Optional, Tuple
+from app.core.config import settings
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def _grid_columns() -> int:
+    return math.ceil(360 / settings.LOCATION_GRID_DEGREES)
+
+
+def _grid_row(latitude: float) -> int:
+    return int((min(max(latitude, -90.0), 90.0) + 90.0) // settings.LOCATION_GRID_DEGREES)
+
+
+def _grid_column(longitude: float) -> int:
+    return min(int((min(max(longitude, -180.0), 180.0) + 180.0) // settings.LOCATION_GRID_DEGREES), _grid_columns() - 1)
+
+
+def grid_cell(latitude: float, longitude: float) -> int:
+    # Célula da grade regular (LOCATION_GRID_DEGREES) que contém o ponto
+    return _grid_row(latitude) * _grid_columns() + _grid_column(longitude)
+
+
+def grid_cells_for_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Optional[List[int]]:
+    # None quando a caixa cobre células demais para um IN eficiente
+    rows = range(_grid_row(min_lat), _grid_row(max_lat) + 1)
+    columns = range(_grid_column(min_lon), _grid_column(max_lon) + 1)
+    if len(rows) * len(columns) > settings.LOCATION_GRID_MAX_CELLS:
+        return None
+    width = _grid_columns()
+    return [row * width + column for row in rows for column in columns]
+
+
+def bbox_around(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(latitude))
+    delta_lon = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return (
+        max(latitude - delta_lat, -90.0),
+        max(longitude - delta_lon, -180.0),
+        min(latitude + delta_lat, 90.0),
+        min(longitude + delta_lon, 180.0),
+    )
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
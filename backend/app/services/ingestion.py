@@ -0,0 +1,130 @@
+import csv
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.services.async_services import AsyncEnvironmentalMetricService
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+# Progresso das cargas recentes, consultável enquanto o upload está em andamento
+_MAX_TRACKED_UPLOADS = 100
+_uploads: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def get_upload_progress(upload_id: str) -> Optional[dict]:
+    return _uploads.get(upload_id)
+
+
+def _track_upload(upload_id: Optional[str], progress: dict) -> None:
+    if upload_id is None:
+        return
+    _uploads[upload_id] = progress
+    _uploads.move_to_end(upload_id)
+    while len(_uploads) > _MAX_TRACKED_UPLOADS:
+        _uploads.popitem(last=False)
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # Apenas a linha incompleta corrente fica em memória
+    pending = b""
+    first = True
+    async for data in stream:
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+            first = False
+    if pending:
+        yield pending.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+
+
+def _parse_csv_line(line: str) -> List[str]:
+    return next(csv.reader([line]))
+
+
+async def ingest_metric_stream(
+    db: AsyncSession,
+    stream: AsyncIterator[bytes],
+    fmt: str,
+    upload_id: Optional[str] = None,
+    chunk_size: Optional[int] = None
+) -> dict:
+    chunk_size = chunk_size or settings.METRICS_STREAM_CHUNK_SIZE
+    progress = {
+        "upload_id": upload_id,
+        "format": fmt,
+        "status": "running",
+        "rows_read": 0,
+        "inserted": 0,
+        "failed": 0,
+        "chunks_committed": 0,
+        "errors": [],
+        "started_at": datetime.utcnow(),
+        "finished_at": None
+    }
+    _track_upload(upload_id, progress)
+
+    def record_errors(errors: List[dict]) -> None:
+        progress["failed"] += len(errors)
+        room = settings.METRICS_STREAM_MAX_ERRORS - len(progress["errors"])
+        if room > 0:
+            progress["errors"].extend(errors[:room])
+
+    async def flush(chunk: List[object], chunk_rows: List[int]) -> None:
+        result = await AsyncEnvironmentalMetricService.create_metrics_batch(db, chunk)
+        progress["inserted"] += result["inserted"]
+        # Converter o índice dentro do lote para o número da linha de dados no arquivo
+        record_errors([
+            {"index": chunk_rows[error["index"]], "detail": error["detail"]}
+            for error in result["errors"]
+        ])
+        progress["chunks_committed"] += 1
+
+    header = None
+    chunk: List[object] = []
+    chunk_rows: List[int] = []
+    index = 0
+    try:
+        async for line in _iter_lines(stream):
+            if not line.strip():
+                continue
+            if fmt == CSV and header is None:
+                header = [column.strip() for column in _parse_csv_line(line)]
+                continue
+
+            try:
+                if fmt == CSV:
+                    values = _parse_csv_line(line)
+                    # Campos vazios usam o valor padrão do schema (ex.: recorded_at)
+                    item = {key: value for key, value in zip(header, values) if value != ""}
+                else:
+                    item = json.loads(line)
+            except (ValueError, csv.Error) as exc:
+                record_errors([{"index": index, "detail": f"Malformed row: {exc}"}])
+                item = None
+
+            if item is not None:
+                chunk.append(item)
+                chunk_rows.append(index)
+            index += 1
+            progress["rows_read"] = index
+
+            if len(chunk) >= chunk_size:
+                await flush(chunk, chunk_rows)
+                chunk, chunk_rows = [], []
+
+        if chunk:
+            await flush(chunk, chunk_rows)
+        progress["status"] = "completed"
+    except Exception:
+        await db.rollback()
+        progress["status"] = "failed"
+        raise
+    finally:
+        progress["finished_at"] = datetime.utcnow()
+
+    return progress
@@ -0,0 +1,232 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import EnvironmentalMetric, MetricRollupHourly, MetricRollupDaily, MetricRollupMonthly
+
+HOURLY = "hourly"
+DAILY = "daily"
+MONTHLY = "monthly"
+
+
+def _truncate_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _truncate_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _truncate_month(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _count_hours(since: datetime, until: datetime) -> int:
+    return int((_truncate_hour(until) - _truncate_hour(since)) / timedelta(hours=1)) + 1
+
+
+def _count_days(since: datetime, until: datetime) -> int:
+    return (_truncate_day(until) - _truncate_day(since)).days + 1
+
+
+def _count_months(since: datetime, until: datetime) -> int:
+    return (until.year - since.year) * 12 + until.month - since.month + 1
+
+
+# Unidades do numpy equivalentes a cada truncamento, para agregação vetorizada
+_NUMPY_UNITS = {HOURLY: "h", DAILY: "D", MONTHLY: "M"}
+
+# Da resolução mais fina para a mais grossa
+RESOLUTIONS = [
+    (HOURLY, MetricRollupHourly, _truncate_hour, _count_hours),
+    (DAILY, MetricRollupDaily, _truncate_day, _count_days),
+    (MONTHLY, MetricRollupMonthly, _truncate_month, _count_months),
+]
+
+
+def normalize_timestamp(value: datetime) -> datetime:
+    # Rollups e métricas brutas são armazenados em UTC sem fuso
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def upsert_statement(dialect: str, model):
+    # INSERT ... ON CONFLICT que soma o bucket novo ao existente
+    table = model.__table__
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+        least, greatest = func.least, func.greatest
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+        least, greatest = func.min, func.max
+    else:
+        raise NotImplementedError(f"Rollups are not supported on {dialect}")
+
+    excluded = stmt.excluded
+    newer = excluded.last_recorded_at >= table.c.last_recorded_at
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.metric_type, table.c.location_id, table.c.bucket_start],
+        set_={
+            "count": table.c.count + excluded.count,
+            "sum": table.c.sum + excluded.sum,
+            "min": least(table.c.min, excluded.min),
+            "max": greatest(table.c.max, excluded.max),
+            "last_value": case((newer, excluded.last_value), else_=table.c.last_value),
+            "last_recorded_at": case((newer, excluded.last_recorded_at), else_=table.c.last_recorded_at),
+        }
+    )
+    return stmt
+
+
+def _upsert(db: Session, model, rows: List[dict]):
+    db.execute(upsert_statement(db.get_bind().dialect.name, model), rows)
+
+
+class MetricRollupService:
+    @staticmethod
+    def apply(db: Session, metrics: Iterable[dict]) -> None:
+        # Agrega o lote em memória e aplica um upsert por resolução; não faz commit
+        metrics = list(metrics)
+        for _, model, truncate, _ in RESOLUTIONS:
+            buckets = {}
+            for metric in metrics:
+                recorded_at = metric["recorded_at"]
+                key = (metric["metric_type"], metric["location_id"], truncate(recorded_at))
+                value = metric["value"]
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = {
+                        "metric_type": key[0],
+                        "location_id": key[1],
+                        "bucket_start": key[2],
+                        "count": 1,
+                        "sum": value,
+                        "min": value,
+                        "max": value,
+                        "last_value": value,
+                        "last_recorded_at": recorded_at
+                    }
+                    continue
+                bucket["count"] += 1
+                bucket["sum"] += value
+                bucket["min"] = min(bucket["min"], value)
+                bucket["max"] = max(bucket["max"], value)
+                if recorded_at >= bucket["last_recorded_at"]:
+                    bucket["last_value"] = value
+                    bucket["last_recorded_at"] = recorded_at
+            if buckets:
+                _upsert(db, model, list(buckets.values()))
+
+    @staticmethod
+    def series_buckets(metric_type: str, location_id: int, stamps: np.ndarray, values: np.ndarray) -> dict:
+        # Versão vetorizada de apply para uma série ordenada por tempo (datetime64 em UTC):
+        # devolve, por modelo de rollup, as colunas dos buckets como arrays
+        stamps = stamps.astype("datetime64[us]")
+        buckets = {}
+        for name, model, _, _ in RESOLUTIONS:
+            keys = stamps.astype(f"datetime64[{_NUMPY_UNITS[name]}]")
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            if not len(starts):
+                continue
+            ends = np.r_[starts[1:], len(keys)]
+            buckets[model] = {
+                "metric_type": np.full(len(starts), metric_type, dtype=object),
+                "location_id": np.full(len(starts), location_id),
+                "bucket_start": keys[starts].astype("datetime64[us]"),
+                "count": ends - starts,
+                "sum": np.add.reduceat(values, starts),
+                "min": np.minimum.reduceat(values, starts),
+                "max": np.maximum.reduceat(values, starts),
+                "last_value": values[ends - 1],
+                "last_recorded_at": stamps[ends - 1]
+            }
+        return buckets
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 10000) -> None:
+        # Recalcula todos os rollups a partir das métricas brutas
+        for _, model, _, _ in RESOLUTIONS:
+            db.query(model).delete()
+        query = select(
+            EnvironmentalMetric.metric_type,
+            EnvironmentalMetric.location_id,
+            EnvironmentalMetric.value,
+            EnvironmentalMetric.recorded_at
+        ).execution_options(yield_per=batch_size)
+        for partition in db.execute(query).mappings().partitions():
+            MetricRollupService.apply(db, [
+                {**row, "recorded_at": normalize_timestamp(row["recorded_at"])} for row in partition
+            ])
+        db.commit()
+
+    @staticmethod
+    def select_resolution(since: datetime, until: datetime, max_points: int) -> str:
+        # Resolução mais fina cujo número de buckets cabe em max_points
+        for name, _, _, count_buckets in RESOLUTIONS:
+            if count_buckets(since, until) <= max_points:
+                return name
+        return MONTHLY
+
+    @staticmethod
+    def get_series(
+        db: Session,
+        metric_type: str,
+        since: datetime,
+        until: datetime,
+        max_points: int,
+        location_id: Optional[int] = None
+    ) -> dict:
+        since, until = normalize_timestamp(since), normalize_timestamp(until)
+        resolution = MetricRollupService.select_resolution(since, until, max_points)
+        _, model, truncate, _ = next(entry for entry in RESOLUTIONS if entry[0] == resolution)
+
+        filters = [
+            model.metric_type == metric_type,
+            model.bucket_start >= truncate(since),
+            model.bucket_start <= until
+        ]
+        if location_id:
+            filters.append(model.location_id == location_id)
+
+        # Sem filtro de localização, os buckets de cada local são combinados no próprio banco
+        totals = select(
+            model.bucket_start,
+            func.sum(model.count).label("count"),
+            func.sum(model.sum).label("sum"),
+            func.min(model.min).label("min"),
+            func.max(model.max).label("max")
+        ).where(*filters).group_by(model.bucket_start).subquery()
+        # Último valor do bucket: o da localização com a leitura mais recente
+        latest = select(
+            model.bucket_start,
+            model.last_value,
+            func.row_number().over(
+                partition_by=model.bucket_start,
+                order_by=(model.last_recorded_at.desc(), model.location_id.desc())
+            ).label("position")
+        ).where(*filters).subquery()
+        query = select(
+            totals.c.bucket_start,
+            totals.c.count,
+            totals.c.sum,
+            totals.c.min,
+            totals.c.max,
+            latest.c.last_value.label("last")
+        ).join(
+            latest, (latest.c.bucket_start == totals.c.bucket_start) & (latest.c.position == 1)
+        ).order_by(totals.c.bucket_start)
+        points = db.execute(query).mappings().all()
+
+        return {
+            "metric_type": metric_type,
+            "location_id": location_id,
+            "resolution": resolution,
+            "since": since,
+            "until": until,
+            "points": [
+                {**point, "mean": point["sum"] / point["count"]} for point in points
+            ]
+        }
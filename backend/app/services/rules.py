@@ -0,0 +1,233 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import AlertRule, AlertRuleKind, AlertRuleOperator
+from app.services.services import AlertRuleService, AlertService, add_metric_write_listener, remove_metric_write_listener
+
+logger = logging.getLogger(__name__)
+
+# Recarrega as regras periodicamente para enxergar alterações feitas por outros workers
+_RULES_MAX_AGE_SECONDS = 60
+_STOP = object()
+
+
+def _epoch_seconds(rows: List[dict]) -> np.ndarray:
+    stamps = np.array([row["recorded_at"] for row in rows], dtype="datetime64[us]")
+    return stamps.astype(np.int64) / 1e6
+
+
+def _fresh_rows(rows: List[dict]) -> List[dict]:
+    max_age = settings.RULE_ENGINE_MAX_READING_AGE_MINUTES
+    if max_age <= 0:
+        return rows
+    # recorded_at já chega normalizado para UTC sem fuso
+    cutoff = datetime.utcnow() - timedelta(minutes=max_age)
+    return [row for row in rows if row["recorded_at"] >= cutoff]
+
+
+class RuleEngine:
+    """Avalia regras de limite e taxa de variação sobre lotes de métricas gravadas.
+
+    As escritas apenas enfileiram as linhas; uma thread dedicada agrupa os lotes,
+    avalia cada regra de forma vetorizada com NumPy e grava os alertas em bloco.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=settings.RULE_ENGINE_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._rules: Dict[str, List[AlertRule]] = {}
+        self._rules_version = -1
+        self._rules_loaded_at = 0.0
+        # Última leitura por (metric_type, location_id), para a taxa de variação entre lotes
+        self._last_reading: Dict[Tuple[str, int], Tuple[float, float]] = {}
+        # Último disparo por (rule_id, location_id), para de-duplicação
+        self._last_fired: Dict[Tuple[int, int], float] = {}
+        self.rows_evaluated = 0
+        self.alerts_created = 0
+        self.batches_dropped = 0
+        self.stale_rows_skipped = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        add_metric_write_listener(self.submit)
+        self._thread = threading.Thread(target=self._run, name="rule-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        remove_metric_write_listener(self.submit)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, rows: List[dict]) -> None:
+        # Dados históricos não geram alertas nem ocupam a fila que atende as leituras ao vivo
+        fresh = _fresh_rows(rows)
+        self.stale_rows_skipped += len(rows) - len(fresh)
+        if not fresh:
+            return
+        rows = fresh
+        # Nunca bloqueia a escrita: com a fila cheia o lote é descartado e contabilizado
+        try:
+            self._queue.put_nowait(rows)
+        except queue.Full:
+            self.batches_dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None,
+            "queued_batches": self._queue.qsize(),
+            "rows_evaluated": self.rows_evaluated,
+            "alerts_created": self.alerts_created,
+            "batches_dropped": self.batches_dropped,
+            "stale_rows_skipped": self.stale_rows_skipped
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            rows = list(item)
+            stop = False
+            # Agrupa o que já estiver na fila em um único lote de avaliação
+            while len(rows) < settings.RULE_ENGINE_MAX_BATCH_ROWS:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                rows.extend(item)
+            try:
+                db = SessionLocal()
+                try:
+                    self.process(db, rows)
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("Rule engine failed to process %d rows", len(rows))
+            if stop:
+                return
+
+    def _load_rules(self, db) -> None:
+        stale = time.monotonic() - self._rules_loaded_at > _RULES_MAX_AGE_SECONDS
+        if self._rules_version == AlertRuleService.version and not stale:
+            return
+        version = AlertRuleService.version
+        rules = defaultdict(list)
+        for rule in AlertRuleService.get_rules(db, active_only=True):
+            db.expunge(rule)
+            rules[rule.metric_type].append(rule)
+        self._rules = dict(rules)
+        self._rules_version = version
+        self._rules_loaded_at = time.monotonic()
+
+    def process(self, db, rows: List[dict]) -> list:
+        self._load_rules(db)
+        alerts = self.evaluate(rows)
+        created = AlertService.create_alerts_bulk(db, alerts)
+        self.rows_evaluated += len(rows)
+        self.alerts_created += len(created)
+        return created
+
+    def evaluate(self, rows: List[dict]) -> List[dict]:
+        by_type = defaultdict(list)
+        for row in rows:
+            by_type[row["metric_type"]].append(row)
+
+        alerts = []
+        for metric_type, type_rows in by_type.items():
+            alerts.extend(self._evaluate_type(metric_type, type_rows))
+        return alerts
+
+    def _evaluate_type(self, metric_type: str, rows: List[dict]) -> List[dict]:
+        locations = np.array([row["location_id"] for row in rows], dtype=np.int64)
+        values = np.array([row["value"] for row in rows], dtype=np.float64)
+        stamps = _epoch_seconds(rows)
+        units = [row.get("unit") or "" for row in rows]
+
+        # Ordena por (localização, tempo) para calcular variações consecutivas
+        order = np.lexsort((stamps, locations))
+        locations, values, stamps = locations[order], values[order], stamps[order]
+        units = [units[index] for index in order]
+
+        first_of_location = np.ones(len(locations), dtype=bool)
+        first_of_location[1:] = locations[1:] != locations[:-1]
+        last_of_location = np.ones(len(locations), dtype=bool)
+        last_of_location[:-1] = locations[1:] != locations[:-1]
+
+        previous_values = np.empty_like(values)
+        previous_stamps = np.empty_like(stamps)
+        previous_values[1:], previous_stamps[1:] = values[:-1], stamps[:-1]
+        for index in np.flatnonzero(first_of_location):
+            last = self._last_reading.get((metric_type, int(locations[index])))
+            previous_stamps[index], previous_values[index] = last if last else (np.nan, np.nan)
+
+        elapsed_hours = (stamps - previous_stamps) / 3600.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = np.where(elapsed_hours > 0, (values - previous_values) / elapsed_hours, np.nan)
+
+        for index in np.flatnonzero(last_of_location):
+            key = (metric_type, int(locations[index]))
+            current = self._last_reading.get(key)
+            if current is None or stamps[index] >= current[0]:
+                self._last_reading[key] = (float(stamps[index]), float(values[index]))
+
+        alerts = []
+        for rule in self._rules.get(metric_type, []):
+            series = rates if rule.kind == AlertRuleKind.RATE_OF_CHANGE else values
+            with np.errstate(invalid="ignore"):
+                if rule.operator == AlertRuleOperator.BELOW:
+                    firing = series < rule.threshold
+                else:
+                    firing = series > rule.threshold
+            if rule.location_id is not None:
+                firing &= locations == rule.location_id
+            indexes = np.flatnonzero(firing)
+            if not len(indexes):
+                continue
+
+            # Um disparo por localização: o mais recente do lote, respeitando o cooldown
+            reversed_indexes = indexes[::-1]
+            _, unique_positions = np.unique(locations[reversed_indexes], return_index=True)
+            cooldown = (rule.cooldown_minutes or 0) * 60
+            for index in reversed_indexes[unique_positions]:
+                location_id = int(locations[index])
+                fired_at = float(stamps[index])
+                last_fired = self._last_fired.get((rule.id, location_id))
+                if last_fired is not None and fired_at - last_fired < cooldown:
+                    continue
+                self._last_fired[(rule.id, location_id)] = fired_at
+                alerts.append(self._build_alert(rule, location_id, float(series[index]), units[index]))
+        return alerts
+
+    @staticmethod
+    def _build_alert(rule: AlertRule, location_id: int, observed: float, unit: str) -> dict:
+        suffix = f" {unit}" if unit else ""
+        if rule.kind == AlertRuleKind.RATE_OF_CHANGE:
+            detail = f"variação de {observed:+.2f}{suffix}/h (limite {rule.threshold:+.2f}{suffix}/h)"
+        else:
+            comparison = "acima" if rule.operator == AlertRuleOperator.ABOVE else "abaixo"
+            detail = f"{observed:.2f}{suffix} {comparison} do limite de {rule.threshold:.2f}{suffix}"
+        return {
+            "title": rule.name,
+            "message": f"{rule.metric_type}: {detail}",
+            "alert_type": rule.alert_type,
+            "location_id": location_id,
+            "user_id": rule.created_by_id,
+            "is_read": False
+        }
+
+
+rule_engine = RuleEngine()
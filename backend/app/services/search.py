@@ -0,0 +1,83 @@
+import re
+from typing import List, Optional
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.orm import Session
+from app.core.pagination import decode_cursor
+from app.models.models import SEARCHABLE_COLUMNS, search_table
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# A primeira coluna pesquisável (título) pesa o dobro no ranking
+_TITLE_WEIGHT = 2.0
+
+
+def _fts_match(query: str) -> Optional[str]:
+    # Cada palavra vira um prefixo entre aspas; palavras são combinadas com AND
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _decode_search_cursor(cursor: str) -> tuple:
+    score, last_id = decode_cursor(cursor, 2)
+    if not isinstance(score, (int, float)) or not isinstance(last_id, int):
+        raise ValueError("Invalid cursor")
+    return float(score), last_id
+
+
+def _sqlite_ranked_ids(db: Session, table: str, query: str, limit: int, after: Optional[tuple]) -> list:
+    match = _fts_match(query)
+    if match is None:
+        return []
+    fts = search_table(table)
+    weights = ", ".join([str(_TITLE_WEIGHT)] + ["1.0"] * (len(SEARCHABLE_COLUMNS[table]) - 1))
+    # O FTS5 ordena pela coluna rank (bm25 com os pesos de "rank MATCH") e para no LIMIT;
+    # rank é menor para os melhores resultados, então o score exposto é o oposto dele
+    sql = (
+        f"SELECT rowid AS id, -rank AS score FROM {fts} "
+        f"WHERE {fts} MATCH :match AND rank MATCH :ranking"
+    )
+    params = {"match": match, "ranking": f"bm25({weights})", "limit": limit}
+    if after is not None:
+        sql += " AND (rank > :rank OR (rank = :rank AND rowid > :id))"
+        params.update(rank=-after[0], id=after[1])
+    sql += " ORDER BY rank, rowid LIMIT :limit"
+    return db.execute(text(sql), params).all()
+
+
+def _postgresql_ranked_ids(db: Session, model, query: str, limit: int, after: Optional[tuple]) -> list:
+    title, body = (getattr(model, column) for column in SEARCHABLE_COLUMNS[model.__tablename__])
+    # %> (word similarity) é atendido pelos índices GIN de trigramas; só as linhas que
+    # casam são pontuadas, e o LIMIT vira uma ordenação top-N
+    score = func.word_similarity(query, title) * _TITLE_WEIGHT + func.word_similarity(query, body)
+    stmt = select(model.id.label("id"), score.label("score")).where(
+        or_(title.op("%>")(query), body.op("%>")(query))
+    )
+    if after is not None:
+        stmt = stmt.where(or_(score < after[0], (score == after[0]) & (model.id > after[1])))
+    return db.execute(stmt.order_by(score.desc(), model.id).limit(limit)).all()
+
+
+class SearchService:
+    @staticmethod
+    def search(db: Session, model, query: str, limit: int = 20, cursor: Optional[str] = None) -> List:
+        after = _decode_search_cursor(cursor) if cursor else None
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            ranked = _postgresql_ranked_ids(db, model, query, limit, after)
+        elif dialect == "sqlite":
+            ranked = _sqlite_ranked_ids(db, model.__tablename__, query, limit, after)
+        else:
+            raise NotImplementedError(f"Search is not supported on {dialect}")
+        if not ranked:
+            return []
+
+        # Carrega as linhas da página e devolve na ordem do ranking, com o score anexado
+        rows = {row.id: row for row in db.query(model).filter(model.id.in_([row.id for row in ranked]))}
+        results = []
+        for row_id, score in ranked:
+            row = rows.get(row_id)
+            if row is not None:
+                row.score = score
+                results.append(row)
+        return results
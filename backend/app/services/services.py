@@ -1,14 +1,26 @@
-from sqlalchemy.orm import Session
-from app.models.models import User, Process, Location, Alert, EnvironmentalMetric
-from app.schemas.schemas import UserCreate, ProcessCreate, LocationCreate, AlertCreate, EnvironmentalMetricCreate
-from app.core.security import get_password_hash
-from typing import List, Optional
+from sqlalchemy import and_, func, insert, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from pydantic import ValidationError
+from app.models.models import User, Process, Location, Alert, AlertRule, EnvironmentalMetric
+from app.schemas.schemas import Alert as AlertSchema, Location as LocationSchema, Process as ProcessSchema, UserCreate, UserUpdate, ProcessCreate, ProcessUpdate, LocationCreate, AlertCreate, AlertBulkAcknowledge, AlertRuleCreate, EnvironmentalMetricCreate
+from app.core.security import get_password_hash, invalidate_user_cache
+from app.core.pagination import decode_cursor, parse_cursor_datetime
+from app.core.result_cache import cached_result, invalidate_cache_tags
+from app.core.broker import get_broker
+from app.services.rollups import MetricRollupService, normalize_timestamp
+from app.services.geo import bbox_around, grid_cells_for_bbox, haversine_km
+from app.services.aggregates import dashboard_aggregates, format_metric_value, format_trend
+from app.services.versions import ALERTS, LOCATIONS, PROCESSES, USERS, ResourceVersionService
+from app.services.counters import adjust_unread_counters, get_unread_count, reconcile_unread_counters, unread_deltas
+from typing import Any, Callable, List, Optional
 from datetime import datetime, timedelta
 
 class UserService:
     @staticmethod
-    def create_user(db: Session, user: UserCreate) -> User:
-        hashed_password = get_password_hash(user.password)
+    def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+        # Rotas assíncronas calculam o hash fora do event loop e o repassam aqui
+        hashed_password = hashed_password or get_password_hash(user.password)
         db_user = User(
             email=user.email,
             username=user.username,
@@ -17,10 +29,37 @@ class UserService:
             hashed_password=hashed_password
         )
         db.add(db_user)
+        ResourceVersionService.bump(db, USERS)
         db.commit()
         db.refresh(db_user)
         return db_user
 
+    @staticmethod
+    def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
+        db_user = db.query(User).filter(User.id == user_id).first()
+        if db_user is None:
+            return None
+        previous_username = db_user.username
+        for field, value in user_update.dict(exclude_unset=True).items():
+            setattr(db_user, field, value)
+        ResourceVersionService.bump(db, USERS)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError("Email or username already registered")
+        db.refresh(db_user)
+        invalidate_user_cache(previous_username)
+        invalidate_user_cache(db_user.username)
+        return db_user
+
+    @staticmethod
+    def get_user_location_ids(db: Session, user_id: int) -> List[int]:
+        # Localizações dos processos e das regras de alerta criados pelo usuário
+        processes = select(Process.location_id).where(Process.created_by_id == user_id, Process.location_id.isnot(None))
+        rules = select(AlertRule.location_id).where(AlertRule.created_by_id == user_id, AlertRule.location_id.isnot(None))
+        return sorted(db.scalars(processes.union(rules)))
+
     @staticmethod
     def get_user_by_email(db: Session, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
@@ -30,8 +69,8 @@ class UserService:
         return db.query(User).filter(User.username == username).first()
 
     @staticmethod
-    def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-        return db.query(User).offset(skip).limit(limit).all()
+    def get_users(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[User]:
+        return paginate(db.query(User), User, skip, limit, cursor)
 
 class ProcessService:
     @staticmethod
@@ -41,19 +80,44 @@ class ProcessService:
             created_by_id=user_id
         )
         db.add(db_process)
+        ResourceVersionService.bump(db, PROCESSES)
         db.commit()
+        invalidate_cache_tags(PROCESSES)
         db.refresh(db_process)
         return db_process
 
     @staticmethod
-    def get_processes(db: Session, skip: int = 0, limit: int = 100) -> List[Process]:
-        return db.query(Process).offset(skip).limit(limit).all()
+    def get_processes(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        columns: Optional[list] = None,
+        expand: tuple = ()
+    ) -> List[Process]:
+        # Com columns, retorna tuplas dessas colunas em vez de objetos ORM
+        query = db.query(*columns) if columns else db.query(Process).options(*expand_options(Process, expand))
+        return paginate(query, Process, skip, limit, cursor)
 
     @staticmethod
     def get_process_by_id(db: Session, process_id: int) -> Optional[Process]:
         return db.query(Process).filter(Process.id == process_id).first()
 
     @staticmethod
+    def update_process(db: Session, process_id: int, process_update: ProcessUpdate) -> Optional[Process]:
+        db_process = db.query(Process).filter(Process.id == process_id).first()
+        if db_process is None:
+            return None
+        for field, value in process_update.dict(exclude_unset=True).items():
+            setattr(db_process, field, value)
+        ResourceVersionService.bump(db, PROCESSES)
+        db.commit()
+        invalidate_cache_tags(PROCESSES)
+        db.refresh(db_process)
+        return db_process
+
+    @staticmethod
+    @cached_result(PROCESSES, schema=ProcessSchema)
     def get_recent_processes(db: Session, limit: int = 5) -> List[Process]:
         return db.query(Process).order_by(Process.created_at.desc()).limit(limit).all()
 
@@ -62,18 +126,50 @@ class LocationService:
     def create_location(db: Session, location: LocationCreate) -> Location:
         db_location = Location(**location.dict())
         db.add(db_location)
+        ResourceVersionService.bump(db, LOCATIONS)
         db.commit()
+        invalidate_cache_tags(LOCATIONS)
         db.refresh(db_location)
         return db_location
 
     @staticmethod
-    def get_locations(db: Session, skip: int = 0, limit: int = 100) -> List[Location]:
-        return db.query(Location).offset(skip).limit(limit).all()
+    @cached_result(LOCATIONS, schema=LocationSchema)
+    def get_locations(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Location]:
+        return paginate(db.query(Location), Location, skip, limit, cursor)
 
     @staticmethod
     def get_location_by_id(db: Session, location_id: int) -> Optional[Location]:
         return db.query(Location).filter(Location.id == location_id).first()
 
+    @staticmethod
+    def get_locations_in_bbox(
+        db: Session, min_lat: float, min_lon: float, max_lat: float, max_lon: float, limit: int = 1000
+    ) -> List[Location]:
+        query = db.query(Location).filter(
+            Location.latitude.between(min_lat, max_lat),
+            Location.longitude.between(min_lon, max_lon)
+        )
+        # Caixas pequenas usam o índice da grade; as grandes, o índice (latitude, longitude)
+        cells = grid_cells_for_bbox(min_lat, min_lon, max_lat, max_lon)
+        if cells is not None:
+            query = query.filter(Location.grid_cell.in_(cells))
+        return query.order_by(Location.id).limit(limit).all()
+
+    @staticmethod
+    def get_nearby_locations(
+        db: Session, latitude: float, longitude: float, radius_km: float, limit: int = 100
+    ) -> List[tuple]:
+        candidates = LocationService.get_locations_in_bbox(
+            db, *bbox_around(latitude, longitude, radius_km), limit=None
+        )
+        nearby = []
+        for location in candidates:
+            distance = haversine_km(latitude, longitude, location.latitude, location.longitude)
+            if distance <= radius_km:
+                nearby.append((location, distance))
+        nearby.sort(key=lambda item: item[1])
+        return nearby[:limit]
+
 class AlertService:
     @staticmethod
     def create_alert(db: Session, alert: AlertCreate, user_id: int) -> Alert:
@@ -82,46 +178,339 @@ class AlertService:
             user_id=user_id
         )
         db.add(db_alert)
+        adjust_unread_counters(db, unread_deltas([user_id]))
         db.commit()
+        invalidate_cache_tags(ALERTS)
         db.refresh(db_alert)
+        dashboard_aggregates.record_alert_created(db_alert.created_at)
+        AlertService.publish_alert(db_alert)
         return db_alert
 
     @staticmethod
-    def get_alerts(db: Session, skip: int = 0, limit: int = 100) -> List[Alert]:
-        return db.query(Alert).offset(skip).limit(limit).all()
+    def create_alerts_bulk(db: Session, alerts: List[dict]) -> List[Alert]:
+        # INSERT multi-linha com RETURNING; usado pelo motor de regras
+        if not alerts:
+            return []
+        db_alerts = list(db.scalars(insert(Alert).returning(Alert), alerts))
+        adjust_unread_counters(db, unread_deltas(
+            db_alert.user_id for db_alert in db_alerts if not db_alert.is_read
+        ))
+        db.commit()
+        invalidate_cache_tags(ALERTS)
+        for db_alert in db_alerts:
+            dashboard_aggregates.record_alert_created(db_alert.created_at)
+            AlertService.publish_alert(db_alert)
+        return db_alerts
 
     @staticmethod
+    def publish_alert(alert: Alert) -> None:
+        payload = AlertSchema.model_validate(alert).model_dump(mode="json")
+        get_broker().publish(alert_topics(alert.location_id, alert.user_id), payload)
+
+    @staticmethod
+    def mark_alert_as_read(db: Session, alert_id: int) -> Optional[Alert]:
+        # UPDATE condicional: só quem efetivamente mudou o alerta decrementa os contadores
+        user_id = db.execute(
+            update(Alert)
+            .where(Alert.id == alert_id, Alert.is_read == False)
+            .values(is_read=True)
+            .returning(Alert.user_id)
+        ).first()
+        if user_id is not None:
+            adjust_unread_counters(db, unread_deltas([user_id[0]], -1))
+        db.commit()
+        invalidate_cache_tags(ALERTS)
+        return db.query(Alert).filter(Alert.id == alert_id).first()
+
+    @staticmethod
+    def acknowledge_alerts(db: Session, criteria: AlertBulkAcknowledge) -> int:
+        conditions = []
+        if criteria.ids is not None:
+            conditions.append(Alert.id.in_(criteria.ids))
+        if criteria.location_id is not None:
+            conditions.append(Alert.location_id == criteria.location_id)
+        if criteria.alert_type is not None:
+            conditions.append(Alert.alert_type == criteria.alert_type)
+        if criteria.created_before is not None:
+            conditions.append(Alert.created_at < normalize_timestamp(criteria.created_before))
+        if not conditions:
+            raise ValueError("At least one acknowledgement criterion is required")
+
+        # Um único UPDATE; os user_ids retornados ajustam os contadores na mesma transação
+        user_ids = db.scalars(
+            update(Alert)
+            .where(Alert.is_read == False, *conditions)
+            .values(is_read=True)
+            .returning(Alert.user_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        adjust_unread_counters(db, unread_deltas(user_ids, -1))
+        db.commit()
+        invalidate_cache_tags(ALERTS)
+        return len(user_ids)
+
+    @staticmethod
+    def get_alerts(
+        db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, expand: tuple = ()
+    ) -> List[Alert]:
+        return paginate(db.query(Alert).options(*expand_options(Alert, expand)), Alert, skip, limit, cursor)
+
+    @staticmethod
+    @cached_result(ALERTS, schema=AlertSchema)
     def get_recent_alerts(db: Session, limit: int = 5) -> List[Alert]:
         return db.query(Alert).order_by(Alert.created_at.desc()).limit(limit).all()
 
     @staticmethod
-    def get_active_alerts_count(db: Session) -> int:
-        return db.query(Alert).filter(Alert.is_read == False).count()
+    def get_active_alerts_count(db: Session, user_id: Optional[int] = None) -> int:
+        return get_unread_count(db, user_id)
+
+    @staticmethod
+    def reconcile_unread_counters(db: Session) -> dict:
+        return reconcile_unread_counters(db)
+
+    @staticmethod
+    def get_alerts_summary(db: Session) -> dict:
+        stats = dashboard_aggregates.alerts_snapshot(db)
+        return {
+            "active_alerts": get_unread_count(db),
+            "active_alerts_trend": format_trend(stats["created_this_month"], stats["created_last_month"])
+        }
+
+class AlertRuleService:
+    # Incrementado a cada alteração para que o motor de regras recarregue as regras
+    version = 0
+
+    @staticmethod
+    def create_rule(db: Session, rule: AlertRuleCreate, user_id: int) -> AlertRule:
+        db_rule = AlertRule(**rule.dict(), created_by_id=user_id)
+        db.add(db_rule)
+        db.commit()
+        db.refresh(db_rule)
+        AlertRuleService.version += 1
+        return db_rule
+
+    @staticmethod
+    def get_rules(db: Session, active_only: bool = False) -> List[AlertRule]:
+        query = db.query(AlertRule)
+        if active_only:
+            query = query.filter(AlertRule.is_active == True)
+        return query.order_by(AlertRule.id).all()
+
+    @staticmethod
+    def deactivate_rule(db: Session, rule_id: int) -> Optional[AlertRule]:
+        db_rule = db.query(AlertRule).filter(AlertRule.id == rule_id).first()
+        if db_rule is None:
+            return None
+        db_rule.is_active = False
+        db.commit()
+        db.refresh(db_rule)
+        AlertRuleService.version += 1
+        return db_rule
 
 class EnvironmentalMetricService:
     @staticmethod
     def create_metric(db: Session, metric: EnvironmentalMetricCreate) -> EnvironmentalMetric:
-        db_metric = EnvironmentalMetric(**metric.dict())
+        data = metric.dict()
+        data["recorded_at"] = normalize_timestamp(data["recorded_at"] or datetime.utcnow())
+        db_metric = EnvironmentalMetric(**data)
         db.add(db_metric)
+        MetricRollupService.apply(db, [data])
         db.commit()
         db.refresh(db_metric)
+        dashboard_aggregates.record_metrics([data])
+        _notify_metric_listeners([data])
         return db_metric
 
     @staticmethod
-    def get_metrics_by_type(db: Session, metric_type: str, location_id: Optional[int] = None) -> List[EnvironmentalMetric]:
-        query = db.query(EnvironmentalMetric).filter(EnvironmentalMetric.metric_type == metric_type)
+    def create_metrics_batch(db: Session, items: List[Any]) -> dict:
+        # Validar todos os itens antes de tocar no banco; erros são reportados por índice
+        errors = []
+        metrics = []
+        for index, item in enumerate(items):
+            try:
+                metrics.append((index, EnvironmentalMetricCreate.model_validate(item)))
+            except ValidationError as exc:
+                errors.append({"index": index, "detail": _format_validation_error(exc)})
+
+        # Uma única consulta para conferir as localizações referenciadas
+        location_ids = {metric.location_id for _, metric in metrics}
+        known_locations = set()
+        if location_ids:
+            known_locations = set(db.scalars(select(Location.id).where(Location.id.in_(location_ids))))
+
+        recorded_at = datetime.utcnow()
+        rows = []
+        for index, metric in metrics:
+            if metric.location_id not in known_locations:
+                errors.append({"index": index, "detail": f"Location {metric.location_id} not found"})
+                continue
+            row = metric.dict()
+            row["recorded_at"] = normalize_timestamp(row["recorded_at"] or recorded_at)
+            rows.append(row)
+
+        # INSERT multi-linha e atualização dos rollups em uma única transação
+        if rows:
+            db.execute(insert(EnvironmentalMetric), rows)
+            MetricRollupService.apply(db, rows)
+            db.commit()
+            dashboard_aggregates.record_metrics(rows)
+            _notify_metric_listeners(rows)
+
+        errors.sort(key=lambda error: error["index"])
+        return {
+            "received": len(items),
+            "inserted": len(rows),
+            "failed": len(errors),
+            "errors": errors
+        }
+
+    @staticmethod
+    def get_metrics_by_type(
+        db: Session,
+        metric_type: str,
+        location_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 1000,
+        cursor: Optional[str] = None,
+        columns: Optional[list] = None,
+        expand: tuple = ()
+    ) -> List[EnvironmentalMetric]:
+        if columns:
+            query = db.query(*columns)
+        else:
+            query = db.query(EnvironmentalMetric).options(*expand_options(EnvironmentalMetric, expand))
+        query = query.filter(EnvironmentalMetric.metric_type == metric_type)
         if location_id:
             query = query.filter(EnvironmentalMetric.location_id == location_id)
-        return query.order_by(EnvironmentalMetric.recorded_at.desc()).all()
+        if since:
+            query = query.filter(EnvironmentalMetric.recorded_at >= normalize_timestamp(since))
+        if until:
+            query = query.filter(EnvironmentalMetric.recorded_at < normalize_timestamp(until))
+        if cursor:
+            # Paginação por keyset em (recorded_at, id), em ordem decrescente
+            recorded_at, metric_id = decode_cursor(cursor, 2)
+            recorded_at = parse_cursor_datetime(recorded_at)
+            if not isinstance(metric_id, int):
+                raise ValueError("Invalid cursor")
+            query = query.filter(or_(
+                EnvironmentalMetric.recorded_at < recorded_at,
+                and_(EnvironmentalMetric.recorded_at == recorded_at, EnvironmentalMetric.id < metric_id)
+            ))
+        return query.order_by(
+            EnvironmentalMetric.recorded_at.desc(), EnvironmentalMetric.id.desc()
+        ).limit(limit).all()
+
+    @staticmethod
+    def reload_dashboard_aggregates(db: Session) -> None:
+        dashboard_aggregates.reload(db)
 
     @staticmethod
     def get_latest_metrics(db: Session) -> dict:
-        # Simular dados para o dashboard
+        snapshot = dashboard_aggregates.metrics_snapshot(db)
+        air = snapshot["air_quality"]
+        water = snapshot["water_quality"]
+        vegetation = snapshot["vegetation_cover"]
         return {
-            "air_quality": "Boa",
-            "air_quality_trend": "+5% desde último mês",
-            "water_resources": "87%",
-            "water_resources_trend": "-2% desde último mês",
-            "vegetation_cover": "94%",
-            "vegetation_cover_trend": "+1% desde último mês"
+            "air_quality": format_metric_value(air["value"], air["unit"]),
+            "air_quality_trend": format_trend(air["month_mean"], air["previous_month_mean"]),
+            "water_resources": format_metric_value(water["value"], water["unit"]),
+            "water_resources_trend": format_trend(water["month_mean"], water["previous_month_mean"]),
+            "vegetation_cover": format_metric_value(vegetation["value"], vegetation["unit"]),
+            "vegetation_cover_trend": format_trend(vegetation["month_mean"], vegetation["previous_month_mean"])
         }
+
+# Consumidores das métricas gravadas (ex.: motor de regras); devem apenas enfileirar
+_metric_write_listeners: List[Callable[[List[dict]], None]] = []
+
+
+def add_metric_write_listener(listener: Callable[[List[dict]], None]) -> None:
+    if listener not in _metric_write_listeners:
+        _metric_write_listeners.append(listener)
+
+
+def remove_metric_write_listener(listener: Callable[[List[dict]], None]) -> None:
+    if listener in _metric_write_listeners:
+        _metric_write_listeners.remove(listener)
+
+
+def _notify_metric_listeners(rows: List[dict]) -> None:
+    for listener in _metric_write_listeners:
+        listener(rows)
+
+
+ALERTS_TOPIC = "alerts"
+
+
+def location_alerts_topic(location_id: int) -> str:
+    return f"{ALERTS_TOPIC}:location:{location_id}"
+
+
+def user_alerts_topic(user_id: int) -> str:
+    return f"{ALERTS_TOPIC}:user:{user_id}"
+
+
+def alert_topics(location_id: Optional[int], user_id: Optional[int]) -> List[str]:
+    # Tópicos em que um alerta é publicado: geral, por localização e por usuário
+    topics = [ALERTS_TOPIC]
+    if location_id is not None:
+        topics.append(location_alerts_topic(location_id))
+    if user_id is not None:
+        topics.append(user_alerts_topic(user_id))
+    return topics
+
+
+def paginate(query: Query, model, skip: int, limit: int, cursor: Optional[str] = None) -> list:
+    # Ordenação estável por id; com cursor, a página começa depois do último id visto
+    query = query.order_by(model.id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise ValueError("Invalid cursor")
+        return query.filter(model.id > last_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+
+# Relacionamentos que as listas incluem via expand=, com a estratégia de carga de cada um.
+# Localizações se repetem entre muitas linhas: uma consulta IN à parte traz cada uma uma vez;
+# usuários são poucas colunas e entram no próprio SELECT da página
+EXPANDABLE = {
+    Process: {"created_by": joinedload, "location": selectinload},
+    Alert: {"user": joinedload, "location": selectinload},
+    EnvironmentalMetric: {"location": selectinload},
+}
+
+
+def parse_expand(model, expand: Optional[str]) -> tuple:
+    # "location,created_by" -> ("created_by", "location"); nomes desconhecidos geram ValueError
+    if not expand:
+        return ()
+    relations = tuple(sorted({name.strip() for name in expand.split(",") if name.strip()}))
+    unknown = [name for name in relations if name not in EXPANDABLE.get(model, {})]
+    if unknown:
+        raise ValueError(f"Cannot expand: {', '.join(unknown)}")
+    return relations
+
+
+def expand_options(model, relations: tuple) -> list:
+    strategies = EXPANDABLE[model] if relations else {}
+    return [strategies[name](getattr(model, name)) for name in relations]
+
+
+def estimate_count(db: Session, model) -> int:
+    # No PostgreSQL usa a estatística do planner em vez de varrer a tabela
+    table = model.__tablename__
+    if db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"), {"table": table}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.query(func.count(model.id)).scalar()
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+        for error in exc.errors()
+    )
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import ResourceVersion
+
+LOCATIONS = "locations"
+USERS = "users"
+PROCESSES = "processes"
+# Só tag do cache de resultados: alertas não têm versão nem ETag
+ALERTS = "alerts"
+
+
+class ResourceVersionService:
+    @staticmethod
+    def bump(db: Session, name: str) -> None:
+        # Chamado na mesma transação da escrita; não faz commit
+        table = ResourceVersion.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(table)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(table)
+        else:
+            raise NotImplementedError(f"Resource versions are not supported on {dialect}")
+        # Segundos inteiros: Last-Modified/If-Modified-Since não carregam fração
+        now = datetime.utcnow().replace(microsecond=0)
+        stmt = stmt.values(name=name, version=1, updated_at=now).on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"version": table.c.version + 1, "updated_at": now}
+        )
+        db.execute(stmt)
+
+    @staticmethod
+    def get(db: Session, name: str) -> Tuple[int, Optional[datetime]]:
+        row = db.execute(
+            select(ResourceVersion.version, ResourceVersion.updated_at).where(ResourceVersion.name == name)
+        ).first()
+        return (row.version, row.updated_at) if row else (0, None)
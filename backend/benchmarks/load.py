@@ -0,0 +1,268 @@
+"""Carga mista ponta a ponta contra app.main:app servido pelo uvicorn.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.load --duration 30 --concurrency 20 --output load-results.json
+    python -m benchmarks.load --url http://localhost:8000   # servidor já em execução
+
+Sem --url, sobe o uvicorn em um processo separado sobre um banco SQLite temporário
+(ou o DATABASE_URL do ambiente) com dados de exemplo. Usuários virtuais executam
+logins, cargas do dashboard, ingestão de métricas, paginação de listas e leitura de
+alertas; o relatório traz vazão e latência p50/p95/p99 por rota e é salvo em JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+METRIC_TYPES = ("air_quality", "water_quality", "vegetation_cover")
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _seed(locations: int, metrics: int, alerts: int) -> None:
+    from app.db_init import seed_synthetic_data
+
+    seed_synthetic_data(locations=locations, processes=locations * 10, alerts=alerts, metrics=metrics, days=90)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[route] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            samples = self.latencies.get(route, [])
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": len(samples) / elapsed,
+                "p50_ms": statistics.median(samples) * 1000 if samples else None,
+                "p95_ms": _percentile(samples, 0.95) * 1000 if samples else None,
+                "p99_ms": _percentile(samples, 0.99) * 1000 if samples else None,
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {"total_requests": total, "throughput_rps": total / elapsed, "routes": routes}
+
+
+async def _login(client, recorder: Recorder) -> Optional[dict]:
+    # Erro de conexão ou resposta de erro (ex.: 503 da fila de hash) já contam como falha da rota
+    response = await recorder.call(
+        client, "POST /api/auth/token", "POST", "/api/auth/token",
+        data={"username": "admin", "password": "password"}
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _first_login(client, recorder: Recorder, attempts: int = 5) -> dict:
+    # Sem um token inicial não há carga a medir; tenta algumas vezes antes de desistir
+    for attempt in range(attempts):
+        headers = await _login(client, recorder)
+        if headers is not None:
+            return headers
+        await asyncio.sleep(0.5 * 2 ** attempt)
+    raise RuntimeError(f"Login failed {attempts} times; check that the server is up and seeded")
+
+
+async def _dashboard(client, recorder, headers, state):
+    await recorder.call(client, "GET /api/dashboard/", "GET", "/api/dashboard/", headers=headers)
+
+
+async def _ingest(client, recorder, headers, state):
+    now = datetime.utcnow()
+    items = [
+        {"metric_type": random.choice(METRIC_TYPES), "value": random.uniform(0, 100), "unit": "%",
+         "location_id": random.randint(1, state["locations"]), "recorded_at": (now - timedelta(seconds=index)).isoformat()}
+        for index in range(state["batch_size"])
+    ]
+    await recorder.call(client, "POST /api/monitoring/batch", "POST", "/api/monitoring/batch", json=items, headers=headers)
+
+
+async def _ingest_one(client, recorder, headers, state):
+    metric = {"metric_type": random.choice(METRIC_TYPES), "value": random.uniform(0, 100), "unit": "%",
+              "location_id": random.randint(1, state["locations"])}
+    await recorder.call(client, "POST /api/monitoring/", "POST", "/api/monitoring/", json=metric, headers=headers)
+
+
+async def _page(client, recorder, headers, state, route: str, url: str, params: dict, pages: int = 3):
+    cursor = None
+    for _ in range(pages):
+        page_params = {**params, "cursor": cursor} if cursor else params
+        response = await recorder.call(client, route, "GET", url, params=page_params, headers=headers)
+        cursor = response.headers.get("x-next-cursor") if response is not None else None
+        if not cursor:
+            return
+
+
+async def _list_processes(client, recorder, headers, state):
+    await _page(client, recorder, headers, state, "GET /api/processes/", "/api/processes/", {"limit": 100})
+
+
+async def _list_locations(client, recorder, headers, state):
+    await _page(client, recorder, headers, state, "GET /api/locations/", "/api/locations/", {"limit": 100})
+
+
+async def _list_metrics(client, recorder, headers, state):
+    params = {"metric_type": random.choice(METRIC_TYPES), "limit": 500}
+    await _page(client, recorder, headers, state, "GET /api/monitoring/", "/api/monitoring/", params)
+
+
+async def _read_alerts(client, recorder, headers, state):
+    response = await recorder.call(client, "GET /api/alerts/", "GET", "/api/alerts/", params={"limit": 50}, headers=headers)
+    await recorder.call(client, "GET /api/alerts/unread-count", "GET", "/api/alerts/unread-count", headers=headers)
+    if response is not None and response.status_code == 200:
+        unread = [alert["id"] for alert in response.json() if not alert["is_read"]]
+        if unread:
+            await recorder.call(
+                client, "PUT /api/alerts/{alert_id}/read", "PUT", f"/api/alerts/{random.choice(unread)}/read", headers=headers
+            )
+
+
+async def _relogin(client, recorder, headers, state):
+    await _login(client, recorder)
+
+
+# Peso relativo de cada operação no tráfego misto
+OPERATIONS = [
+    (_dashboard, 4),
+    (_list_processes, 2),
+    (_list_locations, 2),
+    (_list_metrics, 2),
+    (_read_alerts, 3),
+    (_ingest, 2),
+    (_ingest_one, 2),
+    (_relogin, 1),
+]
+
+
+async def _run(base_url: str, duration: float, concurrency: int, state: dict) -> dict:
+    import httpx
+
+    recorder = Recorder()
+    operations, weights = zip(*OPERATIONS)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        headers = await _first_login(client, recorder)
+        deadline = time.perf_counter() + duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                operation = random.choices(operations, weights)[0]
+                await operation(client, recorder, headers, state)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return recorder.report(elapsed)
+
+
+def _wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn did not become healthy in time")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="servidor já em execução; sem ele, sobe o uvicorn localmente")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn")
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--metrics", type=int, default=50000)
+    parser.add_argument("--alerts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--output", default="load-results.json")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        # Banco SQLite temporário, configurado antes de importar a aplicação
+        workdir = tempfile.mkdtemp(prefix="ecomanager-bench-")
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+        _seed(args.locations, args.metrics, args.alerts)
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            env=os.environ.copy()
+        )
+    try:
+        if server is not None:
+            _wait_for_server(base_url, server)
+        state = {"locations": args.locations, "batch_size": args.batch_size}
+        result = asyncio.run(_run(base_url, args.duration, args.concurrency, state))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    result = {
+        "started_at": datetime.utcnow().isoformat(),
+        "base_url": base_url,
+        "database": os.environ.get("DATABASE_URL", "").split(":", 1)[0] if server else None,
+        "python": platform.python_version(),
+        "duration_seconds": args.duration,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        **result,
+    }
+    with open(args.output, "w") as output:
+        json.dump(result, output, indent=2)
+
+    print(f"{'route':<34}{'req':>7}{'err':>5}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in result["routes"].items():
+        latencies = [f"{stats[key]:9.1f}" if stats[key] is not None else f"{'-':>9}" for key in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{route:<34}{stats['requests']:>7}{stats['errors']:>5}{stats['throughput_rps']:>8.1f}{''.join(latencies)}")
+    print(f"total: {result['total_requests']} requests, {result['throughput_rps']:.1f} req/s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+"""Rajada de logins enquanto outra rota é sondada continuamente.
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.login_burst --logins 200 --concurrency 50
+    PASSWORD_HASH_WORKERS=0 python -m benchmarks.login_burst   # bcrypt inline, para comparação
+
+Mede a vazão de logins e a latência de GET /api/auth/me durante a rajada.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def _run(logins: int, concurrency: int) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"username": "admin", "password": "password"}
+        token = (await client.post("/api/auth/token", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        probe_latencies = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/auth/me", headers=headers)
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = []
+
+        async def login():
+            async with semaphore:
+                response = await client.post("/api/auth/token", data=credentials)
+                statuses.append(response.status_code)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "logins": logins,
+        "ok": statuses.count(200),
+        "rejected": len(statuses) - statuses.count(200),
+        "logins_per_second": logins / elapsed,
+        "probe_requests": len(probe_latencies),
+        "probe_p50_ms": statistics.median(probe_latencies) * 1000,
+        "probe_p95_ms": _percentile(probe_latencies, 0.95) * 1000,
+        "probe_max_ms": max(probe_latencies) * 1000,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    # Banco SQLite temporário, configurado antes de importar a aplicação
+    workdir = tempfile.mkdtemp(prefix="ecomanager-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+    from app.core.config import settings
+    from app.db_init import init_db
+    init_db()
+
+    result = asyncio.run(_run(args.logins, args.concurrency))
+    print(f"PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}")
+    for key, value in result.items():
+        print(f"{key:>20}: {value:.2f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
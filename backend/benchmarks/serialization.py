@@ -0,0 +1,121 @@
+"""Compara o caminho padrão (ORM + response_model + json) com o caminho rápido (colunas + orjson).
+
+Uso (a partir de backend/):
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+
+Mede GET /api/processes/ e GET /api/monitoring/ com FAST_JSON_RESPONSES desligado e
+ligado, e confere que os dois caminhos produzem exatamente os mesmos bytes.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _seed(rows: int) -> None:
+    from sqlalchemy import insert
+    from app.core.database import SessionLocal
+    from app.models.models import EnvironmentalMetric, Process, ProcessStatus
+
+    random.seed(42)
+    now = datetime.utcnow().replace(microsecond=0)
+    statuses = list(ProcessStatus)
+    db = SessionLocal()
+    try:
+        db.execute(insert(Process), [
+            {
+                "title": f"Processo {index}",
+                "description": f"Licença de operação nº {index} — unidade \"Norte\"",
+                "status": statuses[index % len(statuses)],
+                "priority": random.choice(["alta", "média", "baixa"]),
+                "due_date": now + timedelta(days=index % 365, microseconds=index % 7 * 125000),
+                "location_id": 1,
+                "created_by_id": 1
+            }
+            for index in range(rows)
+        ])
+        db.execute(insert(EnvironmentalMetric), [
+            {
+                "metric_type": "air_quality",
+                "value": round(random.uniform(0, 150), random.randint(0, 6)),
+                "unit": "µg/m³",
+                "location_id": 1,
+                "recorded_at": now - timedelta(minutes=index)
+            }
+            for index in range(rows)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _run(rows: int, repeat: int) -> list:
+    import httpx
+    from app.core.config import settings
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"username": "admin", "password": "password"}
+        token = (await client.post("/api/auth/token", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        targets = [
+            ("processes", "/api/processes/", {"limit": rows}),
+            ("metrics", "/api/monitoring/", {"metric_type": "air_quality", "limit": rows}),
+        ]
+
+        results = []
+        for name, url, params in targets:
+            timings, bodies = {}, {}
+            for fast in (False, True):
+                settings.FAST_JSON_RESPONSES = fast
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    response = await client.get(url, params=params, headers=headers)
+                    samples.append(time.perf_counter() - started)
+                    response.raise_for_status()
+                timings[fast] = statistics.median(samples) * 1000
+                bodies[fast] = response.content
+            results.append({
+                "endpoint": name,
+                "rows": rows,
+                "standard_ms": timings[False],
+                "fast_ms": timings[True],
+                "speedup": timings[False] / timings[True],
+                "identical": bodies[False] == bodies[True],
+            })
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    # Banco SQLite temporário, configurado antes de importar a aplicação
+    workdir = tempfile.mkdtemp(prefix="ecomanager-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+    os.environ.setdefault("RULE_ENGINE_ENABLED", "false")
+    from app.db_init import init_db
+    init_db()
+    _seed(args.rows)
+
+    results = asyncio.run(_run(args.rows, args.repeat))
+    for result in results:
+        print(result["endpoint"])
+        for key, value in result.items():
+            if key == "endpoint":
+                continue
+            print(f"{key:>20}: {value:.2f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+# As configurações são lidas ao importar app.core.config: nunca tocar no banco de desenvolvimento
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='ecomanager-tests-')}/app.db"
+os.environ["RULE_ENGINE_ENABLED"] = "false"
+os.environ["ALERT_COUNTERS_RECONCILE_SECONDS"] = "0"
+os.environ["DASHBOARD_AGGREGATES_RELOAD_SECONDS"] = "0"
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.core.result_cache import InProcessResultCache, set_result_cache
+from app.models.models import Location, User, UserRole
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def result_cache():
+    # A chave do cache de resultados não inclui a sessão: cada teste começa com um cache vazio
+    cache = InProcessResultCache(settings.RESULT_CACHE_SIZE, settings.RESULT_CACHE_TTL_SECONDS)
+    set_result_cache(cache)
+    return cache
+
+
+@pytest.fixture
+def user(db):
+    user = User(
+        email="analyst@ecomanager.com",
+        username="analyst",
+        full_name="Analista",
+        hashed_password="not-a-real-hash",
+        role=UserRole.ANALYST,
+        is_active=True
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def location(db):
+    location = Location(name="Estação 1", description="", latitude=-23.55, longitude=-46.63, address="")
+    db.add(location)
+    db.commit()
+    return location
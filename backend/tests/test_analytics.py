@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from app.services.analytics import windowed_statistics
+
+
+def _naive(locations, values, window, min_periods, z_threshold, percentiles):
+    # Referência linha a linha, uma janela por vez
+    n = len(values)
+    mean, std, z_score = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+    rolling = np.full((len(percentiles), n), np.nan)
+    for row in range(n):
+        first = row
+        while first > 0 and locations[first - 1] == locations[row] and row - first + 1 < window:
+            first -= 1
+        current = values[first:row + 1]
+        if len(current) >= min_periods:
+            mean[row] = current.mean()
+            if len(current) > 1:
+                std[row] = current.std(ddof=1)
+            for index, percentile in enumerate(percentiles):
+                rolling[index, row] = np.percentile(current, percentile)
+        previous_first = first if row - first + 1 < window else first - 1
+        if previous_first < 0 or locations[previous_first] != locations[row]:
+            previous_first = first
+        previous = values[previous_first:row]
+        if len(previous) >= max(min_periods, 2) and previous.std(ddof=1) > 0:
+            z_score[row] = (values[row] - previous.mean()) / previous.std(ddof=1)
+    return mean, std, z_score, rolling
+
+
+@pytest.mark.parametrize("window, min_periods", [(1, 1), (3, 2), (5, 5), (24, 3)])
+def test_windowed_statistics_match_naive(window, min_periods):
+    rng = np.random.default_rng(3)
+    locations = np.repeat([4, 7, 9], [30, 1, 45])
+    values = rng.normal(50, 10, size=len(locations))
+    values[40:44] = 12.5  # trecho constante: desvio zero, sem z-score
+    percentiles = (5, 50, 95)
+
+    stats = windowed_statistics(locations, values, window, min_periods, 2.0, percentiles)
+    mean, std, z_score, rolling = _naive(locations, values, window, min_periods, 2.0, percentiles)
+    np.testing.assert_allclose(stats["mean"], mean, equal_nan=True)
+    np.testing.assert_allclose(stats["std"], std, rtol=1e-7, atol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(stats["z_score"], z_score, rtol=1e-7, atol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(stats["percentiles"], rolling, equal_nan=True)
+    np.testing.assert_array_equal(stats["is_anomaly"], np.abs(np.nan_to_num(z_score)) >= 2.0)
+
+
+def test_spike_is_flagged_against_previous_window():
+    locations = np.zeros(20, dtype=np.int64)
+    values = np.tile([10.0, 11.0], 10)
+    values[-1] = 100.0
+    stats = windowed_statistics(locations, values, window=8, min_periods=4, z_threshold=3.0)
+    assert np.flatnonzero(stats["is_anomaly"]).tolist() == [19]
+
+
+def test_empty_input():
+    stats = windowed_statistics(np.empty(0, np.int64), np.empty(0), 10, 3, 3.0, (50,))
+    assert stats["mean"].shape == (0,)
+    assert stats["percentiles"].shape == (1, 0)
+
+
+def test_constant_window_has_no_z_score():
+    # Sensor travado: janela de desvio zero não tem escore, e a leitura seguinte não vira anomalia
+    locations = np.zeros(12, dtype=np.int64)
+    values = np.r_[np.linspace(40.0, 60.0, 6), np.full(5, 12.5), 50.0]
+    stats = windowed_statistics(locations, values, window=4, min_periods=2, z_threshold=3.0)
+    assert np.isnan(stats["z_score"][10:]).all()
+    assert stats["std"][10] == 0.0
+    # Só a queda para o valor travado é anômala
+    assert np.flatnonzero(stats["is_anomaly"]).tolist() == [6]
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import Request
+from app.core.conditional import collection_etag, not_modified, row_etag
+from app.schemas.schemas import LocationCreate
+from app.services.services import LocationService
+from app.services.versions import LOCATIONS, PROCESSES, ResourceVersionService
+
+LAST_MODIFIED = datetime(2026, 5, 4, 12, 30, 15)
+
+
+def _request(query: str = "", **headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/locations/",
+        "query_string": query.encode(),
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_collection_etag_depends_on_version_and_query():
+    etag = collection_etag(LOCATIONS, 3, _request("skip=0&limit=10"))
+    # Ordem dos parâmetros não importa
+    assert collection_etag(LOCATIONS, 3, _request("limit=10&skip=0")) == etag
+    assert collection_etag(LOCATIONS, 4, _request("skip=0&limit=10")) != etag
+    assert collection_etag(LOCATIONS, 3, _request("skip=10&limit=10")) != etag
+    assert collection_etag(LOCATIONS, 3, _request("skip=0&limit=10"), related=[2]) != etag
+
+
+def test_row_etag_changes_with_row():
+    etag = row_etag(PROCESSES, 1, 7, LAST_MODIFIED)
+    assert row_etag(PROCESSES, 1, 7, LAST_MODIFIED + timedelta(seconds=1)) != etag
+    assert row_etag(PROCESSES, 2, 7, LAST_MODIFIED) != etag
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    ('"locations-1-abc"', 304),
+    ('W/"locations-1-abc"', 304),
+    ('"other", "locations-1-abc"', 304),
+    ("*", 304),
+    ('"locations-0-abc"', None),
+])
+def test_if_none_match(if_none_match, expected):
+    response = not_modified(_request(if_none_match=if_none_match), '"locations-1-abc"', LAST_MODIFIED)
+    assert (response and response.status_code) == expected
+    if response:
+        assert response.headers["etag"] == '"locations-1-abc"'
+        assert response.headers["last-modified"] == "Mon, 04 May 2026 12:30:15 GMT"
+
+
+@pytest.mark.parametrize("if_modified_since, expected", [
+    ("Mon, 04 May 2026 12:30:15 GMT", 304),
+    ("Mon, 04 May 2026 13:00:00 GMT", 304),
+    ("Mon, 04 May 2026 12:30:14 GMT", None),
+    ("not a date", None),
+])
+def test_if_modified_since(if_modified_since, expected):
+    response = not_modified(_request(if_modified_since=if_modified_since), '"locations-1-abc"', LAST_MODIFIED)
+    assert (response and response.status_code) == expected
+
+
+def test_if_none_match_takes_precedence():
+    request = _request(if_none_match='"stale"', if_modified_since="Mon, 04 May 2026 13:00:00 GMT")
+    assert not_modified(request, '"locations-1-abc"', LAST_MODIFIED) is None
+
+
+def test_writes_bump_the_collection_version(db):
+    assert ResourceVersionService.get(db, LOCATIONS) == (0, None)
+    etag = collection_etag(LOCATIONS, 0, _request())
+    LocationService.create_location(db, LocationCreate(name="Estação", description="", latitude=0, longitude=0, address=""))
+    version, last_modified = ResourceVersionService.get(db, LOCATIONS)
+    assert version == 1 and last_modified is not None
+    assert not_modified(_request(if_none_match=etag), collection_etag(LOCATIONS, version, _request()), last_modified) is None
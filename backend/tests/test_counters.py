@@ -0,0 +1,61 @@
+from sqlalchemy import update
+from app.models.models import Alert, AlertType
+from app.schemas.schemas import AlertBulkAcknowledge, AlertCreate
+from app.services.counters import GLOBAL_COUNTER, adjust_unread_counters, get_unread_count, unread_deltas
+from app.services.services import AlertService
+
+
+def _create_alerts(db, location, user_id, count, alert_type=AlertType.WARNING):
+    return [
+        AlertService.create_alert(
+            db, AlertCreate(title=f"Alerta {index}", message="", alert_type=alert_type, location_id=location.id), user_id
+        )
+        for index in range(count)
+    ]
+
+
+def test_unread_deltas_count_global_and_user():
+    assert unread_deltas([1, 1, None, 2]) == {GLOBAL_COUNTER: 4, 1: 2, 2: 1}
+    assert unread_deltas([3], -1) == {GLOBAL_COUNTER: -1, 3: -1}
+    assert unread_deltas([]) == {}
+
+
+def test_counters_follow_create_and_read(db, user, location):
+    alerts = _create_alerts(db, location, user.id, 3)
+    assert get_unread_count(db) == 3
+    assert get_unread_count(db, user.id) == 3
+
+    AlertService.mark_alert_as_read(db, alerts[0].id)
+    # Marcar de novo um alerta já lido não decrementa outra vez
+    AlertService.mark_alert_as_read(db, alerts[0].id)
+    assert get_unread_count(db) == 2
+    assert get_unread_count(db, user.id) == 2
+
+
+def test_bulk_acknowledge_decrements_only_changed_alerts(db, user, location):
+    _create_alerts(db, location, user.id, 2, AlertType.ERROR)
+    _create_alerts(db, location, user.id, 3, AlertType.INFO)
+
+    assert AlertService.acknowledge_alerts(db, AlertBulkAcknowledge(alert_type=AlertType.ERROR)) == 2
+    assert AlertService.acknowledge_alerts(db, AlertBulkAcknowledge(alert_type=AlertType.ERROR)) == 0
+    assert get_unread_count(db) == 3
+    assert get_unread_count(db, user.id) == 3
+
+
+def test_counters_never_go_negative(db, user):
+    adjust_unread_counters(db, {GLOBAL_COUNTER: -5, user.id: -1})
+    db.commit()
+    assert get_unread_count(db) == 0
+    assert get_unread_count(db, user.id) == 0
+
+
+def test_reconcile_repairs_drift(db, user, location):
+    _create_alerts(db, location, user.id, 4)
+    # Escrita fora do serviço: os contadores ficam desatualizados até a reconciliação
+    db.execute(update(Alert).where(Alert.id <= 2).values(is_read=True))
+    db.commit()
+    assert get_unread_count(db) == 4
+
+    assert AlertService.reconcile_unread_counters(db) == {GLOBAL_COUNTER: 2, user.id: 2}
+    assert get_unread_count(db) == 2
+    assert get_unread_count(db, user.id) == 2
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from app import db_init
+from app.models.models import EnvironmentalMetric, Location, MetricRollupDaily, MetricRollupHourly
+
+
+@pytest.fixture
+def seeder(engine, monkeypatch):
+    monkeypatch.setattr(db_init, "engine", engine)
+    monkeypatch.setattr(db_init, "SessionLocal", sessionmaker(bind=engine))
+
+    def seed(**kwargs):
+        options = dict(locations=3, users=2, processes=10, alerts=20, metrics=900, days=2, batch_size=500)
+        return db_init.seed_synthetic_data(**{**options, **kwargs})
+    return seed
+
+
+def _rollup_count(db, model):
+    return db.scalar(select(func.sum(model.count)))
+
+
+def test_seed_keeps_rollups_in_step_with_metrics(db, seeder):
+    result = seeder()
+    metrics = db.scalar(select(func.count(EnvironmentalMetric.id)))
+    assert result["metrics"] == metrics
+    assert _rollup_count(db, MetricRollupHourly) == metrics
+    assert _rollup_count(db, MetricRollupDaily) == metrics
+
+
+def test_seed_without_new_locations_merges_existing_buckets(db, seeder):
+    seeder()
+    # Sem novas localizações, as séries caem nos mesmos buckets da carga anterior
+    result = seeder(locations=0, users=0)
+    assert result["locations"] == db.scalar(select(func.count(Location.id)))
+    metrics = db.scalar(select(func.count(EnvironmentalMetric.id)))
+    assert _rollup_count(db, MetricRollupHourly) == metrics
+    assert _rollup_count(db, MetricRollupDaily) == metrics
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import pytest
+from app.core.pagination import decode_cursor, encode_cursor, next_cursor, parse_cursor_datetime
+from app.models.models import EnvironmentalMetric, Process
+from app.services.services import EnvironmentalMetricService, ProcessService
+
+
+def _processes(db, location, user, count):
+    db.add_all([
+        Process(
+            title=f"Processo {index}",
+            description="",
+            priority="media",
+            due_date=datetime(2026, 1, 1),
+            location_id=location.id,
+            created_by_id=user.id
+        )
+        for index in range(count)
+    ])
+    db.commit()
+
+
+def test_cursor_round_trip():
+    stamp = datetime(2026, 3, 1, 12, 30, 15, 250)
+    values = decode_cursor(encode_cursor(stamp, 42), 2)
+    assert parse_cursor_datetime(values[0]) == stamp
+    assert values[1] == 42
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor(1, 2, 3), encode_cursor({"id": 1})])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_next_cursor_only_for_full_pages():
+    class Row:
+        def __init__(self, id):
+            self.id = id
+
+    assert next_cursor([Row(1), Row(2)], 3, "id") is None
+    assert next_cursor([], 3, "id") is None
+    assert decode_cursor(next_cursor([Row(1), Row(2)], 2, "id"), 1) == [2]
+
+
+def test_cursor_pages_cover_every_row_once(db, location, user):
+    _processes(db, location, user, 23)
+    seen, cursor = [], None
+    while True:
+        page = ProcessService.get_processes(db, limit=5, cursor=cursor)
+        seen.extend(process.id for process in page)
+        cursor = next_cursor(page, 5, "id")
+        if cursor is None:
+            break
+    assert seen == sorted(process.id for process in db.query(Process))
+
+
+def test_cursor_is_not_shifted_by_new_rows(db, location, user):
+    _processes(db, location, user, 10)
+    first = ProcessService.get_processes(db, limit=5)
+    # Com offset, a inserção durante a paginação repetiria ou pularia linhas; o keyset não
+    _processes(db, location, user, 3)
+    second = ProcessService.get_processes(db, limit=5, cursor=next_cursor(first, 5, "id"))
+    last_id = first[-1].id
+    assert [process.id for process in second] == list(range(last_id + 1, last_id + 6))
+
+
+def test_metric_keyset_breaks_timestamp_ties_by_id(db, location):
+    start = datetime(2026, 5, 1)
+    # Pares de leituras no mesmo instante: a página não pode cortar um empate pela metade
+    db.add_all([
+        EnvironmentalMetric(
+            metric_type="air_quality", value=float(index), unit="AQI",
+            location_id=location.id, recorded_at=start + timedelta(minutes=index // 2)
+        )
+        for index in range(21)
+    ])
+    db.commit()
+    seen, cursor = [], None
+    while True:
+        page = EnvironmentalMetricService.get_metrics_by_type(db, "air_quality", limit=4, cursor=cursor)
+        seen.extend((metric.recorded_at, metric.id) for metric in page)
+        cursor = next_cursor(page, 4, "recorded_at", "id")
+        if cursor is None:
+            break
+    assert len(seen) == 21
+    assert seen == sorted(seen, reverse=True)
@@ -0,0 +1,80 @@
+from datetime import datetime
+from sqlalchemy import insert
+from app.core.result_cache import cached_result, invalidate_cache_tags
+from app.models.models import Process
+from app.schemas.schemas import LocationCreate, ProcessCreate, ProcessUpdate
+from app.services.services import LocationService, ProcessService
+
+
+def _raw_process(db, location, user, title):
+    # Escrita fora do serviço: não invalida o cache
+    db.execute(insert(Process), [{
+        "title": title, "description": "", "priority": "alta", "due_date": datetime(2026, 12, 1),
+        "location_id": location.id, "created_by_id": user.id
+    }])
+    db.commit()
+
+
+def _process(location, title):
+    return ProcessCreate(title=title, description="", priority="alta", due_date=datetime(2026, 12, 1), location_id=location.id)
+
+
+def test_cached_result_serves_until_tag_invalidated(db, user, location):
+    _raw_process(db, location, user, "Outorga")
+    assert [process.title for process in ProcessService.get_recent_processes(db)] == ["Outorga"]
+
+    _raw_process(db, location, user, "Licença")
+    assert len(ProcessService.get_recent_processes(db)) == 1
+
+    invalidate_cache_tags("processes")
+    assert len(ProcessService.get_recent_processes(db)) == 2
+
+
+def test_service_writes_invalidate_their_tag(db, user, location):
+    assert ProcessService.get_recent_processes(db) == []
+    process = ProcessService.create_process(db, _process(location, "Outorga"), user.id)
+    assert [cached.title for cached in ProcessService.get_recent_processes(db)] == ["Outorga"]
+
+    ProcessService.update_process(db, process.id, ProcessUpdate(title="Outorga renovada"))
+    assert [cached.title for cached in ProcessService.get_recent_processes(db)] == ["Outorga renovada"]
+
+
+def test_invalidation_is_scoped_to_the_tag(db, user, location):
+    ProcessService.get_recent_processes(db)
+    _raw_process(db, location, user, "Outorga")
+    LocationService.create_location(db, LocationCreate(name="Estação 2", description="", latitude=0, longitude=0, address=""))
+    # Uma escrita em locais não descarta os processos em cache
+    assert ProcessService.get_recent_processes(db) == []
+    assert len(LocationService.get_locations(db)) == 2
+
+
+def test_arguments_are_part_of_the_key(db, user, location):
+    for title in ("A", "B", "C"):
+        ProcessService.create_process(db, _process(location, title), user.id)
+    assert len(ProcessService.get_recent_processes(db, limit=2)) == 2
+    assert len(ProcessService.get_recent_processes(db, limit=3)) == 3
+
+
+def test_cached_values_are_detached_from_the_session(db, user, location):
+    ProcessService.create_process(db, _process(location, "Outorga"), user.id)
+    cached = ProcessService.get_recent_processes(db)
+    db.close()
+    # Schemas do pydantic, não objetos ORM presos à sessão que os carregou
+    assert cached[0].title == "Outorga"
+    assert not isinstance(cached[0], Process)
+
+
+def test_in_process_cache_counts_invalidations(result_cache):
+    calls = []
+
+    @cached_result("things")
+    def load(db, key):
+        calls.append(key)
+        return key
+
+    assert load(None, 1) == load(None, 1) == 1
+    assert calls == [1]
+    invalidate_cache_tags("things", "other")
+    load(None, 1)
+    assert calls == [1, 1]
+    assert result_cache.stats()["invalidations"] == 1
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.models.models import Location, MetricRollupDaily, MetricRollupHourly
+from app.services.rollups import DAILY, HOURLY, MONTHLY, MetricRollupService
+
+
+def _metric(location_id, recorded_at, value, metric_type="air_quality"):
+    return {"metric_type": metric_type, "location_id": location_id, "recorded_at": recorded_at, "value": value}
+
+
+@pytest.mark.parametrize("days, max_points, expected", [
+    (1, 100, HOURLY),
+    (10, 240, HOURLY),
+    (10, 239, DAILY),
+    (90, 100, DAILY),
+    (400, 100, MONTHLY),
+    (4000, 10, MONTHLY),
+])
+def test_select_resolution(days, max_points, expected):
+    until = datetime(2026, 6, 30, 23, 59)
+    since = until - timedelta(days=days) + timedelta(minutes=1)
+    assert MetricRollupService.select_resolution(since, until, max_points) == expected
+
+
+def test_apply_accumulates_into_existing_buckets(db, location):
+    start = datetime(2026, 4, 1, 10)
+    MetricRollupService.apply(db, [_metric(location.id, start + timedelta(minutes=5), 10.0)])
+    MetricRollupService.apply(db, [
+        _metric(location.id, start + timedelta(minutes=50), 30.0),
+        # Leitura atrasada: entra na soma, mas não substitui o último valor
+        _metric(location.id, start + timedelta(minutes=1), 2.0),
+    ])
+    db.commit()
+    hourly = db.query(MetricRollupHourly).one()
+    assert (hourly.count, hourly.sum, hourly.min, hourly.max) == (3, 42.0, 2.0, 30.0)
+    assert hourly.last_value == 30.0
+    assert db.query(MetricRollupDaily).one().count == 3
+
+
+def test_series_buckets_match_apply(db, location):
+    rng = np.random.default_rng(7)
+    start = np.datetime64("2026-01-30T22:00:00", "us")
+    stamps = start + np.sort(rng.integers(0, 3 * 86400 * 10**6, size=500)).astype("timedelta64[us]")
+    values = rng.uniform(0, 100, size=500).round(2)
+    MetricRollupService.apply(db, [
+        _metric(location.id, stamp, float(value)) for stamp, value in zip(stamps.tolist(), values)
+    ])
+    db.commit()
+
+    buckets = MetricRollupService.series_buckets("air_quality", location.id, stamps, values)
+    for model, columns in buckets.items():
+        stored = db.query(model).order_by(model.bucket_start).all()
+        assert [row.bucket_start for row in stored] == columns["bucket_start"].tolist()
+        assert [row.count for row in stored] == columns["count"].tolist()
+        assert [row.min for row in stored] == columns["min"].tolist()
+        assert [row.max for row in stored] == columns["max"].tolist()
+        assert [row.last_value for row in stored] == columns["last_value"].tolist()
+        assert np.allclose([row.sum for row in stored], columns["sum"])
+
+
+def test_series_combines_locations(db, location):
+    other = Location(name="Estação 2", description="", latitude=-22.9, longitude=-43.2, address="")
+    db.add(other)
+    db.commit()
+    hour = datetime(2026, 4, 2, 8)
+    MetricRollupService.apply(db, [
+        _metric(location.id, hour + timedelta(minutes=10), 10.0),
+        _metric(location.id, hour + timedelta(minutes=40), 20.0),
+        _metric(other.id, hour + timedelta(minutes=30), 60.0),
+        _metric(other.id, hour + timedelta(hours=1, minutes=5), 5.0),
+        _metric(other.id, hour + timedelta(minutes=20), 1.0, metric_type="water_quality"),
+    ])
+    db.commit()
+
+    series = MetricRollupService.get_series(db, "air_quality", hour, hour + timedelta(hours=2), max_points=10)
+    assert series["resolution"] == HOURLY
+    first, second = series["points"]
+    assert first["bucket_start"] == hour
+    assert (first["count"], first["min"], first["max"], first["mean"]) == (3, 10.0, 60.0, 30.0)
+    # Último valor do bucket combinado: a leitura mais recente entre as localizações
+    assert first["last"] == 20.0
+    assert (second["count"], second["last"]) == (1, 5.0)
+
+    single = MetricRollupService.get_series(db, "air_quality", hour, hour + timedelta(hours=2), 10, location_id=other.id)
+    assert [(point["count"], point["last"]) for point in single["points"]] == [(1, 60.0), (1, 5.0)]
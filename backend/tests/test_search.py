@@ -0,0 +1,56 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import insert
+from app.core.pagination import encode_cursor
+from app.models.models import Process
+from app.services.search import SearchService
+
+
+@pytest.fixture
+def processes(db, user, location):
+    rows = [
+        ("Outorga de água", "Renovação da outorga de captação"),
+        ("Licença de operação", "Condicionante de outorga pendente"),
+        ("Relatório de efluentes", "Monitoramento mensal"),
+        ("Outorga", "Outorga de lançamento de efluentes"),
+    ]
+    rows += [(f"Licença {index}", "Acompanhamento de outorga") for index in range(30)]
+    db.execute(insert(Process), [{
+        "title": title, "description": description, "priority": "alta", "due_date": datetime(2026, 12, 1),
+        "location_id": location.id, "created_by_id": user.id
+    } for title, description in rows])
+    db.commit()
+
+
+def test_title_matches_rank_first(db, processes):
+    results = SearchService.search(db, Process, "outorga", limit=3)
+    assert [result.title for result in results][:2] == ["Outorga", "Outorga de água"]
+    assert [result.score for result in results] == sorted((result.score for result in results), reverse=True)
+
+
+def test_prefix_and_accents(db, processes):
+    assert [result.title for result in SearchService.search(db, Process, "efluente")] == [
+        "Relatório de efluentes", "Outorga"
+    ]
+    assert [result.title for result in SearchService.search(db, Process, "agua")] == ["Outorga de água"]
+    assert SearchService.search(db, Process, "!!!") == []
+
+
+def test_pages_follow_the_ranking_without_gaps(db, processes):
+    everything = SearchService.search(db, Process, "outorga", limit=100)
+    assert len(everything) == 33
+
+    seen, cursor = [], None
+    while True:
+        page = SearchService.search(db, Process, "outorga", limit=5, cursor=cursor)
+        if not page:
+            break
+        seen.extend(result.id for result in page)
+        cursor = encode_cursor(page[-1].score, page[-1].id)
+    # Empates de score (as 30 licenças) são desfeitos pelo id
+    assert seen == [result.id for result in everything]
+
+
+def test_invalid_cursor(db, processes):
+    with pytest.raises(ValueError):
+        SearchService.search(db, Process, "outorga", cursor=encode_cursor("x", 1))